@@ -47,7 +47,7 @@ class bpsk:
     return carrier_signal, carrier_time
 
   ## Generate BPSK signal with given parameters
-  def custom_bpsk(s,center_freq,sample_factor,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase):
+  def custom_bpsk(s,center_freq,sample_factor,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase,fixed_point=False):
 
     f0 = center_freq
 
@@ -114,7 +114,11 @@ class bpsk:
     BPSK = np.array(carrier_signal) * np.array(c_a) #* np.array(boc)  
 
     ## scale our BPSK signal to the discretized sample values
-    s.sig.scale_signal(BPSK,s.Nr)
+    ##  - fixed_point: Q1.(Nr-1) FixedPoint array on integer storage
+    if(fixed_point):
+      BPSK = signal.FixedPoint.from_float(BPSK, s.Nr)
+    else:
+      s.sig.scale_signal(BPSK, s.Nr)
 
     ## store useful info 
     s.custom_center_freq = f0
@@ -124,7 +128,7 @@ class bpsk:
 
     return BPSK, carrier_time
 
-  def digitals_bpsk(s,clk_rate,center_freq,num_gen,chipping_rate,chip_number,prn_factor):
+  def digitals_bpsk(s,clk_rate,center_freq,num_gen,chipping_rate,chip_number,prn_factor,fixed_point=False):
     ### DIGITALS unit limitations
     #   - In the case of the digitals unit, we have no control over sample rate (sample_frequency)
     #     due to the nature of how we generate sinusoids
@@ -197,7 +201,11 @@ class bpsk:
     BPSK = np.array(c_a) * np.array(carrier_signal)
 
     ## scale our BPSK signal to the proper sample values
-    s.sig.scale_signal(BPSK, s.Nr)
+    ##  - fixed_point: Q1.(Nr-1) FixedPoint array on integer storage
+    if(fixed_point):
+      BPSK = signal.FixedPoint.from_float(BPSK, s.Nr)
+    else:
+      s.sig.scale_signal(BPSK, s.Nr)
 
     ## store useful info 
     s.digitals_center_freq = f0
@@ -207,7 +215,7 @@ class bpsk:
 
     return BPSK, carrier_time
 
-  def digitals_bpsk_mod(s,clk_rate,center_freq,num_gen,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase):
+  def digitals_bpsk_mod(s,clk_rate,center_freq,num_gen,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase,fixed_point=False):
     ### DIGITALS unit limitations
     #   - In the case of the digitals unit, we have no control over sample rate (sample_frequency)
     #     due to the nature of how we generate sinusoids
@@ -328,7 +336,11 @@ class bpsk:
       BPSK = BPSK * np.array(boc)
 
     ## scale our BPSK signal to the proper sample values
-    s.sig.scale_signal(BPSK, s.Nr)
+    ##  - fixed_point: Q1.(Nr-1) FixedPoint array on integer storage
+    if(fixed_point):
+      BPSK = signal.FixedPoint.from_float(BPSK, s.Nr)
+    else:
+      s.sig.scale_signal(BPSK, s.Nr)
 
     ## store useful info 
     s.digitals_center_freq = f0
@@ -336,4 +348,114 @@ class bpsk:
     s.digitals_sample_rate = sample_freq
     s.digitals_f0_prn_mult = F0_PRN_MULT
 
-    return BPSK, carrier_time
\ No newline at end of file
+    return BPSK, carrier_time
+
+  ############################################
+  ### Chunked (lazy) BPSK block generators ###
+  ############################################
+  ## - yield the modulated, quantized signal in blocks of 'block_size'
+  ##   samples instead of building the whole record in memory
+  ## - sample n is computed directly from its index, so carrier phase,
+  ##   C/A chip phase and BOC phase run on continuously across blocks
+  ## - the carrier time steps are the ones np.linspace uses in
+  ##   custom_bpsk/ digitals_bpsk_mod, so the first 'carrier_length'
+  ##   samples are identical to the in-memory signal (after scale_signal)
+  ## - num_samples past one record keeps the same time step and the
+  ##   C/A code repeats every 1023 chips, the way gen_ca_code tiles it
+  ## - blocks are int16 sample arrays (FixedPoint with fixed_point=True),
+  ##   ready for StreamingFIR.process
+
+  ## block engine shared by both generators
+  ##  - t_step:     carrier time step, t_stop the time of the last record sample
+  ##  - prn_spc/ boc_spc: samples per C/A chip/ BOC half period (0 = not applied)
+  def _bpsk_blocks(s,f0,t_step,t_stop,carrier_length,prn_spc,boc_spc,boc_phase,num_samples,block_size,fixed_point):
+    ca = gp.ca_code(1)
+
+    for start in range(0, num_samples, block_size):
+      n = np.arange(start, min(start + block_size, num_samples))
+
+      ## carrier, linspace sets its last sample to exactly t_stop
+      carrier_time = n * t_step
+      carrier_time[n == carrier_length-1] = t_stop
+      BPSK = np.sin(2 * s.pi * f0 * carrier_time)
+
+      ## C/A chip and BOC half period of each sample
+      if(prn_spc):
+        BPSK *= ca[(n // prn_spc).astype(np.int64) % len(ca)]
+      if(boc_spc):
+        # sin phase starts at -1, cosine phase at +1
+        boc = np.where((n // boc_spc).astype(np.int64) % 2 == 0, -1, 1)
+        if(boc_phase != 0): boc = -boc
+        BPSK *= boc
+
+      if(fixed_point):
+        yield signal.FixedPoint.from_float(BPSK, s.Nr)
+      else:
+        yield s.sig.quantize_signal(BPSK, s.Nr)[0]
+
+  ## chunked version of custom_bpsk
+  ##  - num_samples defaults to one record (the custom_bpsk length)
+  def custom_bpsk_blocks(s,center_freq,sample_factor,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase,
+                         block_size=1<<20,num_samples=None,fixed_point=False):
+    f0 = center_freq
+    T_f0 = 1/ f0
+
+    ## same sample rate adjustment as custom_bpsk
+    boc_sampling_factor, sample_factor = s.sig.adjust_sample_rate(sample_factor, f0, chipping_rate,
+                                                              boc_factor, prn_factor, chip_number)
+    F0_PRN_MULT = f0/ (chipping_rate  * prn_factor)
+    carrier_length = int(F0_PRN_MULT * sample_factor * chip_number)
+    t_stop = F0_PRN_MULT*T_f0*chip_number
+
+    ## store useful info
+    s.custom_center_freq = f0
+    s.custom_sample_factor = sample_factor
+    s.custom_sample_rate = f0 * sample_factor
+    s.custom_f0_prn_mult = F0_PRN_MULT
+
+    if(num_samples is None): num_samples = carrier_length
+    ## custom_bpsk does not apply its BOC wave
+    return s._bpsk_blocks(f0, t_stop/ (carrier_length-1), t_stop, carrier_length,
+                          F0_PRN_MULT*sample_factor, 0, boc_phase, num_samples, block_size, fixed_point)
+
+  ## chunked version of digitals_bpsk_mod
+  ##  - num_samples defaults to one record (the digitals_bpsk_mod length)
+  def digitals_bpsk_mod_blocks(s,clk_rate,center_freq,num_gen,chipping_rate,chip_number,prn_factor,boc_factor,boc_phase,
+                               block_size=1<<20,num_samples=None,fixed_point=False):
+    Ng = num_gen
+
+    ## same frequency/ rate adjustments as digitals_bpsk_mod
+    Ns = 2**s.Nr
+    base_rate = (clk_rate/ Ns) * Ng
+    f0 = int(center_freq / base_rate) * base_rate
+    T0 = 1/ f0
+    sample_factor = clk_rate * Ng / f0
+    sample_freq = clk_rate * Ng
+    base_factor = sample_freq / chipping_rate
+
+    prn_sample_factor = 0
+    boc_sample_factor = 0
+    if(prn_factor != 0):
+      prn_factor = int(m.floor(prn_factor))
+      while((base_factor/prn_factor) != m.floor((base_factor/prn_factor))):
+        prn_factor -= 1
+      prn_sample_factor = base_factor / prn_factor
+    if(boc_factor != 0):
+      boc_factor = int(m.floor(boc_factor))
+      while((base_factor/boc_factor) != m.floor((base_factor/boc_factor))):
+        boc_factor -= 1
+      boc_sample_factor = base_factor / boc_factor
+
+    F0_PRN_MULT = f0/ (chipping_rate * prn_factor)
+    carrier_length = int((sample_freq/(chipping_rate * prn_factor)) * chip_number)
+    t_stop = F0_PRN_MULT*T0*chip_number
+
+    ## store useful info
+    s.digitals_center_freq = f0
+    s.digitals_sample_factor = sample_factor
+    s.digitals_sample_rate = sample_freq
+    s.digitals_f0_prn_mult = F0_PRN_MULT
+
+    if(num_samples is None): num_samples = carrier_length
+    return s._bpsk_blocks(f0, t_stop/ (carrier_length-1), t_stop, carrier_length,
+                          prn_sample_factor, boc_sample_factor, boc_phase, num_samples, block_size, fixed_point)
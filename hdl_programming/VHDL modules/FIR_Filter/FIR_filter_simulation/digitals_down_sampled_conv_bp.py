@@ -70,19 +70,16 @@ conv_time_range = bpsk_time_range + kernel_time_range
 conv_time = np.linspace(0,conv_time_range,conv_len)
 conv = np.convolve(d_bpsk,kernel)
 
+# same convolution through the polyphase engine: full-rate kernel split across N_paths lanes
+pp_conv = s.polyphase_convolve(d_bpsk,kernel,N_paths)
+print("polyphase max error: ",np.max(np.abs(pp_conv - conv)))
+
 ########################################################
 ### Down sampled signal + kernel (padded with zeros) ###
 ########################################################
 
 # down-sampled-padded signals
-s_dp = []
-for i in range(N_paths): 
-  s_dp.append(list(np.zeros(Ns)))
-
-# populate down-sampled signal arrays
-for path in range(N_paths):
-  for idx in range(len(d_bpsk)):
-    if(idx % N_paths == path): s_dp[path][idx] = d_bpsk[idx]
+s_dp = s.down_sample_pad_path(d_bpsk,N_paths)
 
 # convolve down-sampled signals with kernel
 s_dp_conv = []
@@ -62,14 +62,7 @@ conv = np.convolve(sine,kernel)
 ########################################################
 
 # down-sampled-padded signals
-s_dp = []
-for i in range(N_paths): 
-  s_dp.append(list(np.zeros(Ns)))
-
-# populate down-sampled signal arrays
-for path in range(N_paths):
-  for idx in range(len(sine)):
-    if(idx % N_paths == path): s_dp[path][idx] = sine[idx]
+s_dp = s.down_sample_pad_path(sine,N_paths)
 
 # convolve down-sampled signals with kernel
 s_dp_conv = []
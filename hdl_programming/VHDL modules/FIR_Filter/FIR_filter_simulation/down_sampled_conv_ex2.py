@@ -75,14 +75,7 @@ conv = np.convolve(sinu,kernel)
 ########################################################
 
 # down-sampled-padded signals
-s_dp = []
-for i in range(N_paths): 
-  s_dp.append(list(np.zeros(Ns)))
-
-# populate down-sampled signal arrays
-for path in range(N_paths):
-  for idx in range(len(sinu)):
-    if(idx % N_paths == path): s_dp[path][idx] = sinu[idx]
+s_dp = s.down_sample_pad_path(sinu,N_paths)
 
 # convolve down-sampled signals with kernel
 s_dp_conv = []
@@ -361,4 +361,12 @@ class filter:
     s.f_cl = f_cl 
     s.f_ch = f_ch
 
-    return bp_filt, bp_filt_t
\ No newline at end of file
+    return bp_filt, bp_filt_t
+
+  ## kernel as a FixedPoint array, quantized the same way as the
+  ## FPGA kernel multipliers: floor(h * (2^frac_bits - 1))
+  ##  - word length is the fraction bits plus sign and integer bits needed
+  def fixed_kernel(s,kernel,frac_bits=30):
+    kern_i = np.floor(np.asarray(kernel, dtype=np.float64) * (pow(2,frac_bits) - 1)).astype(np.int64)
+    word_len = max(int(np.abs(kern_i).max()).bit_length(), frac_bits) + 1
+    return sig.FixedPoint(kern_i, word_len, frac_bits)
@@ -97,7 +97,7 @@ bp_filt_disc = s.discretize_kernel(bp_filt)
 bpsk_bp_filt = np.convolve(c_bpsk, bp_filt)
 
 ## convolve the input signal with filter using FPGA convolve technique
-bpsk_bp_filt_f = s.fpga_convolve(c_bpsk, bp_filt)
+bpsk_bp_filt_f = s.fpga_convolve_fast(c_bpsk, bp_filt)
 
 ## determine filter kernel multipliers for FPGA
 fpga_kernel = s.generate_filt_mult(bp_filt)
@@ -1,71 +1,21 @@
+import numpy as np
+
+## G2 output taps (1 indexed) for each SV, from IS-GPS-200 table 3-Ia
+SV_TAPS = {
+     1: (2,6),   2: (3,7),   3: (4,8),   4: (5,9),
+     5: (1,9),   6: (2,10),  7: (1,8),   8: (2,9),
+     9: (3,10), 10: (2,3),  11: (3,4),  12: (5,6),
+    13: (6,7),  14: (7,8),  15: (8,9),  16: (9,10),
+    17: (1,4),  18: (2,5),  19: (3,6),  20: (4,7),
+    21: (5,8),  22: (6,9),  23: (1,3),  24: (4,6),
+    25: (5,7),  26: (6,8),  27: (7,9),  28: (8,10),
+    29: (1,6),  30: (2,7),  31: (3,8),  32: (4,9),
+}
+
 def SV(vehicle_num):
-    if(vehicle_num == 1):
-        return [2,6]
-    elif(vehicle_num == 2):
-        return [3,7]
-    elif(vehicle_num == 3):
-        return [4,8]
-    elif(vehicle_num == 4):
-        return [5,9]
-    elif(vehicle_num == 5):
-        return [1,9]
-    elif(vehicle_num == 6):
-        return [2,10]
-    elif(vehicle_num == 7):
-        return [1,8]
-    elif(vehicle_num == 8):
-        return [2,9]
-    elif(vehicle_num == 9):
-        return [3,10]
-    elif(vehicle_num == 10):
-        return [2,3]
-    elif(vehicle_num == 11):
-        return [3,4]
-    elif(vehicle_num == 12):
-        return [5,6]
-    elif(vehicle_num == 13):
-        return [6,7]
-    elif(vehicle_num == 14):
-        return [7,8]
-    elif(vehicle_num == 15):
-        return [8,9]
-    elif(vehicle_num == 16):
-        return [9,10]
-    elif(vehicle_num == 17):
-        return [1,4]
-    elif(vehicle_num == 18):
-        return [2,5]
-    elif(vehicle_num == 19):
-        return [3,6]
-    elif(vehicle_num == 20):
-        return [4,7]
-    elif(vehicle_num == 21):
-        return [5,8]
-    elif(vehicle_num == 22):
-        return [6,9]
-    elif(vehicle_num == 23):
-        return [1,3]
-    elif(vehicle_num == 24):
-        return [4,6]
-    elif(vehicle_num == 25):
-        return [5,7]
-    elif(vehicle_num == 26):
-        return [6,8]
-    elif(vehicle_num == 27):    
-        return [7,9]
-    elif(vehicle_num == 28):
-        return [8,10]
-    elif(vehicle_num == 29):
-        return [1,6]
-    elif(vehicle_num == 30):
-        return [2,7]
-    elif(vehicle_num == 31):
-        return [3,8]
-    elif(vehicle_num == 32):
-        return [4,9]
-    else:
-        return [2,6]
-               
+    # unknown SVs fall back to SV 1's taps
+    return list(SV_TAPS.get(vehicle_num, SV_TAPS[1]))
+
 def shift(register, feedback, output):
 
     """ GPS Shift Register
@@ -110,4 +60,233 @@ def generate_prn(sv, chip_count):
             c_a[i] = -1
 
     return c_a
-   
\ No newline at end of file
+
+## C/A code length (one code period)
+CA_CODE_LEN = 1023
+
+## G2 delay (in chips) for each SV, from IS-GPS-200 table 3-Ia
+##  - selecting taps SV(sv) of G2 is the same as delaying the G2 output
+##    sequence by G2_DELAYS[sv-1] chips
+G2_DELAYS = [  5,   6,   7,   8,  17,  18, 139, 140,
+             141, 251, 252, 254, 255, 256, 257, 258,
+             469, 470, 471, 472, 473, 474, 509, 512,
+             513, 514, 515, 516, 859, 860, 861, 862]
+
+_g1_g2 = None
+_ca_code_cache = {}
+
+def gold_sequences():
+
+    """ G1/ G2 output sequences
+    :returns (G1, G2) uint8 0/1 arrays of one code period, generated once:
+    """
+    global _g1_g2
+    if _g1_g2 is None:
+        g1 = LFSR(10, [3,10]).bits(CA_CODE_LEN)
+        g2 = LFSR(10, [2,3,6,8,9,10]).bits(CA_CODE_LEN)
+        _g1_g2 = (g1, g2)
+    return _g1_g2
+
+def ca_code(sv, chip_count=CA_CODE_LEN):
+
+    """ Cached C/A code, same values as generate_prn
+    :param int sv: satellite number (1-32), unknown SVs get SV 1's code
+        (same fallback as SV())
+    :param int chip_count: number of chips, codes longer than one
+        period repeat
+    :returns read-only int8 +/-1 array:
+    """
+    if sv not in SV_TAPS:
+        sv = 1
+    if sv not in _ca_code_cache:
+        g1, g2 = gold_sequences()
+        # G2 tap selection == G2 delayed by the SV's delay
+        chips = g1 ^ np.roll(g2, G2_DELAYS[sv-1])
+        code = (2 * chips.astype(np.int8) - 1)
+        code.flags.writeable = False
+        _ca_code_cache[sv] = code
+
+    code = _ca_code_cache[sv]
+    if chip_count <= CA_CODE_LEN:
+        return code[:chip_count]
+    tiled = np.resize(code, chip_count)
+    tiled.flags.writeable = False
+    return tiled
+
+## number of GPS SVs with C/A codes in G2_DELAYS
+NUM_SV = len(G2_DELAYS)
+
+## C/A chipping rate (Hz)
+CA_CHIP_RATE = 1.023e6
+
+_ca_matrix = None
+_ca_fft_cache = {}
+
+def ca_code_matrix():
+
+    """ C/A codes of every SV
+    :returns read-only (32, 1023) int8 +/-1 array, row sv-1 is ca_code(sv):
+    """
+    global _ca_matrix
+    if _ca_matrix is None:
+        _ca_matrix = np.stack([ca_code(sv) for sv in range(1, NUM_SV+1)])
+        _ca_matrix.flags.writeable = False
+    return _ca_matrix
+
+def ca_code_shifts(sv):
+
+    """ All circular shifts of one SV's code (zero-copy)
+    :returns read-only (1023, 1023) view, row k is np.roll(ca_code(sv), -k):
+    """
+    code = ca_code(sv)
+    doubled = np.concatenate((code, code[:-1]))
+    doubled.flags.writeable = False
+    return np.lib.stride_tricks.sliding_window_view(doubled, CA_CODE_LEN)
+
+def upsample_ca_codes(sample_rate, chip_rate=CA_CHIP_RATE):
+
+    """ Every SV's code sampled over one code period
+    :param float sample_rate: sample rate (Hz), need not be a multiple of chip_rate
+    :returns (32, Ns) int8 array, Ns = round(1023 * sample_rate / chip_rate):
+    """
+    Ns = int(round(CA_CODE_LEN * sample_rate / chip_rate))
+    chip_idx = (np.arange(Ns) * (chip_rate / sample_rate)).astype(np.int64) % CA_CODE_LEN
+    return ca_code_matrix()[:, chip_idx]
+
+def ca_code_ffts(sample_rate, chip_rate=CA_CHIP_RATE):
+
+    """ Cached FFTs of the upsampled codes of every SV
+    :returns read-only (32, Ns) complex array, one FFT per row:
+    """
+    key = (float(sample_rate), float(chip_rate))
+    if key not in _ca_fft_cache:
+        codes_ft = np.fft.fft(upsample_ca_codes(sample_rate, chip_rate), axis=1)
+        codes_ft.flags.writeable = False
+        _ca_fft_cache[key] = codes_ft
+    return _ca_fft_cache[key]
+
+def code_phase_search(signal, sample_rate, chip_rate=CA_CHIP_RATE):
+
+    """ Parallel code-phase search against every SV
+    :param signal: baseband capture (real or complex), one code period
+        (Ns samples) is used, shorter captures are zero padded
+    :returns (corr, sv, phase): corr is the (32, Ns) circular correlation
+        magnitude for every SV and code phase (in samples), sv/ phase is
+        the peak:
+    """
+    codes_ft = ca_code_ffts(sample_rate, chip_rate)
+    Ns = codes_ft.shape[1]
+    sig_ft = np.fft.fft(np.asarray(signal)[:Ns], Ns)
+
+    # one batched circular correlation for all SVs
+    corr = np.abs(np.fft.ifft(sig_ft[None, :] * np.conj(codes_ft), axis=1))
+    sv_idx, phase = np.unravel_index(np.argmax(corr), corr.shape)
+    return corr, int(sv_idx) + 1, int(phase)
+
+class LFSR:
+
+    """ Packed-integer linear feedback shift register
+    :param int length: number of stages
+    :param list taps: feedback stages (1 indexed), e.g. [3,10] for G1
+    :param int state: initial register, bit i holds stage i+1 (default all ones)
+    :param list output: output stages (1 indexed, XOR'd), fibonacci only,
+        default is the last stage
+    :param str mode: 'fibonacci' - same register as shift(): the XOR of the
+        feedback stages is shifted into stage 1
+                     'galois' - the output (last stage) is XOR'd into the
+        stages after each feedback tap as the register shifts
+    - bits are generated 64 at a time: the register is linear over GF(2),
+      so the 64 output bits and the state 64 steps later are XORs of
+      per-byte table lookups on the current state
+    """
+
+    WORD = 64
+
+    def __init__(self, length, taps, state=None, output=None, mode='fibonacci'):
+        if mode not in ('fibonacci', 'galois'):
+            raise ValueError("unknown LFSR mode: %s" % mode)
+        self.length = length
+        self.mask = (1 << length) - 1
+        self.mode = mode
+        self.state = self.mask if state is None else state & self.mask
+
+        if mode == 'fibonacci':
+            self.fb_mask = sum(1 << (t-1) for t in taps)
+            self.out_mask = sum(1 << (t-1) for t in (output or [length]))
+        else:
+            # same recurrence as the fibonacci taps: a feedback tap at stage t
+            #   toggles the bit shifted into stage length-t+1
+            self.fb_mask = 1 | sum(1 << (length-t) for t in taps if t < length)
+            self.out_mask = 1 << (length-1)
+
+        self._build_tables()
+
+    def _step(self, state):
+        # one clock, returns (output bit, next state)
+        out = bin(state & self.out_mask).count('1') & 1
+        if self.mode == 'fibonacci':
+            fb = bin(state & self.fb_mask).count('1') & 1
+            return out, ((state << 1) & self.mask) | fb
+        state = (state << 1) & self.mask
+        if out: state ^= self.fb_mask
+        return out, state
+
+    def _build_tables(self):
+        # image of each single-bit state after WORD clocks:
+        #   (WORD output bits packed in an int, state WORD clocks later)
+        basis = []
+        for i in range(self.length):
+            state, word = 1 << i, 0
+            for t in range(self.WORD):
+                out, state = self._step(state)
+                word |= out << t
+            basis.append((word, state))
+
+        # one table per state byte, entries built by linearity
+        self.tables = []
+        for byte in range(-(-self.length // 8)):
+            table = [(0, 0)] * 256
+            for v in range(1, 256):
+                low = v & -v
+                bit = byte*8 + low.bit_length() - 1
+                if bit >= self.length:
+                    table[v] = table[v ^ low]
+                    continue
+                w, s = table[v ^ low]
+                table[v] = (w ^ basis[bit][0], s ^ basis[bit][1])
+            self.tables.append(table)
+
+    def step(self):
+
+        """ Clock the register once
+        :returns output bit:
+        """
+        out, self.state = self._step(self.state)
+        return out
+
+    def next_word(self):
+
+        """ Clock the register WORD (64) times
+        :returns int, output bit t in bit t:
+        """
+        state, word, nxt = self.state, 0, 0
+        for table in self.tables:
+            w, s = table[state & 0xFF]
+            word ^= w
+            nxt ^= s
+            state >>= 8
+        self.state = nxt
+        return word
+
+    def bits(self, n):
+
+        """ Next n output bits
+        :returns uint8 0/1 array:
+        """
+        n_words, tail = divmod(n, self.WORD)
+        words = [self.next_word() for i in range(n_words)]
+        # a partial last word is clocked bit by bit
+        tail_bits = [self.step() for i in range(tail)]
+        packed = np.array(words, dtype='<u8').view(np.uint8)
+        return np.concatenate((np.unpackbits(packed, bitorder='little'),
+                               np.array(tail_bits, dtype=np.uint8)))
@@ -1,6 +1,8 @@
 import numpy as np
 import math as m
 import gps as gp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 
 ### Notes: 
 #    * We are using numpy arrays
@@ -37,6 +39,11 @@ class util:
         # instance variables
         self.Nr = Nr
 
+        # kernel spectra cache for the FFT multi-lane engine, (kernel, nfft) -> rfft
+        #   - bounded to kernel_spectra_max entries, oldest are dropped first
+        self.kernel_spectra = {}
+        self.kernel_spectra_max = 4
+
     def down_sample_signal(self,signal,Nds):
         # down sample signal by down-sample factor (Nds)
         signal_ds = []
@@ -53,31 +60,107 @@ class util:
         # s11, s7, s3  ->  path 4
         #########################
 
-        # empty list to hold path lists
-        s_ds = []
-        
-        # for each path, a new 'empty' list is appended
-        for path in range(Nds):
-            s_ds.append(list([]))   
+        # each path takes every Nds'th sample, starting at its own offset
+        return [list(signal[path::Nds]) for path in range(Nds)]
+
+    # - zero-copy version of down_sample_split_path
+    # - returns an (N_paths, Nds) strided view of the signal:
+    #     lanes[path][i] = signal[i*N_paths + path]
+    # - writes to the view write through to the signal
+    # - the signal length must be a multiple of N_paths, unless pad=True
+    #   (the zero padded copy is then split instead)
+    # - copy=True returns a contiguous copy instead of a view
+    def split_lanes(self, signal, N_paths, copy=False, pad=False):
+        signal = np.asarray(signal)
+        Ns = len(signal)
+        if(Ns % N_paths != 0):
+            if(not pad):
+                raise ValueError("signal length %d is not a multiple of %d paths" % (Ns, N_paths))
+            padded = np.zeros(-(-Ns // N_paths) * N_paths, dtype=signal.dtype)
+            padded[:Ns] = signal
+            signal = padded
+        Nds = len(signal) // N_paths
+        stride = signal.strides[0]
+        lanes = np.lib.stride_tricks.as_strided(signal, shape=(N_paths, Nds), strides=(stride, N_paths*stride))
+        if(copy): return np.ascontiguousarray(lanes)
+        return lanes
+
+    # - inverse of split_lanes: splice (N_paths, Nds) lanes back to one signal
+    #     signal[i*N_paths + path] = lanes[path][i]
+    # - 'out' may be given to splice into an existing array
+    def interleave_lanes(self, lanes, out=None):
+        lanes = np.asarray(lanes)
+        N_paths, Nds = lanes.shape
+        if(out is None): out = np.empty(N_paths * Nds, dtype=lanes.dtype)
+        out.reshape(Nds, N_paths)[:] = lanes.T
+        return out
 
-        # run through signal list, each path gets one sample
-        # then, go back to first path
-        for path in range(Nds):
-            for s in range(len(signal)):
-                if(s % Nds == path): s_ds[path].append(signal[s])
-        return s_ds
+    # zero-copy version of down_sample_signal (every Nds'th sample)
+    def down_sample_view(self, signal, Nds):
+        return np.asarray(signal)[::Nds]
+
+    # - each path keeps the full signal length, with the samples
+    #   of the other paths set to zero
+    # - (N_paths, Ns) array, same as the s_dp arrays built in the demos
+    def down_sample_pad_path(self, signal, N_paths):
+        signal = np.asarray(signal)
+        s_dp = np.zeros((N_paths, len(signal)), dtype=signal.dtype)
+        for path in range(N_paths):
+            s_dp[path, path::N_paths] = signal[path::N_paths]
+        return s_dp
 
     
     def scale_signal(self,signal,resolution):
         ## determine scale factor and scale the signal
         scale_factor = (2 ** (resolution-1))
 
+        ## float arrays are scaled in place in one pass
+        if(isinstance(signal, np.ndarray) and signal.dtype.kind == 'f'):
+            np.clip(np.trunc(signal*scale_factor), -scale_factor, scale_factor-1, out=signal)
+            return
+
         ## keep signal inside of signed power-of-two range
         for idx in range(len(signal)):
             signal[idx] = int(signal[idx]*scale_factor)
             if(signal[idx] > scale_factor-1): signal[idx] = scale_factor-1
             elif(signal[idx] < -scale_factor): signal[idx] = -scale_factor
 
+    # smallest signed integer type holding 'Nr' bit samples
+    def sample_dtype(self, Nr):
+        if(Nr <= 16): return np.int16
+        elif(Nr <= 32): return np.int32
+        return np.int64
+
+    # - vectorized quantizer, returns (samples, clipped)
+    #   samples: signed integer array (int16/ int32 chosen from Nr)
+    #   clipped: number of samples that were out of range (overload count)
+    # - signal is scaled by 2^(Nr-1), same as scale_signal
+    # - rounding:
+    #     'truncate'   - round toward zero (same as scale_signal)
+    #     'convergent' - round half to even (convergent_rounding_complex.vhd)
+    # - saturate: clamp to [-2^(Nr-1), 2^(Nr-1)-1], otherwise wrap around
+    #   the way a two's complement register would
+    def quantize_signal(self, signal, Nr=None, rounding='truncate', saturate=True):
+        if(Nr is None): Nr = self.Nr
+        scale_factor = 2 ** (Nr-1)
+        scaled = np.asarray(signal, dtype=np.float64) * scale_factor
+
+        if(rounding == 'truncate'):     scaled = np.trunc(scaled)
+        elif(rounding == 'convergent'): scaled = np.rint(scaled)
+        else: raise ValueError("unknown rounding mode: %s" % rounding)
+
+        over = scaled > scale_factor-1
+        under = scaled < -scale_factor
+        clipped = int(np.count_nonzero(over) + np.count_nonzero(under))
+
+        if(saturate):
+            scaled = np.clip(scaled, -scale_factor, scale_factor-1)
+            samples = scaled.astype(self.sample_dtype(Nr))
+        else:
+            wrapped = (scaled.astype(np.int64) + scale_factor) % (2*scale_factor) - scale_factor
+            samples = wrapped.astype(self.sample_dtype(Nr))
+        return samples, clipped
+
     # Forces  (boc_sampling_rate), (carrier_list_length), and (L1_PRN_MULT * sampling_factor) 
     #   to be integer values by changing the effective sampling rate 
     def adjust_sample_rate(self,sampling_factor, f0, chipping_rate, boc_factor, prn_factor, chip_number):
@@ -103,54 +186,49 @@ class util:
             else:
                 sampling_factor += 1
 
+    # - stretch chips to samples, returns an int8 array
+    # - integer samples_per_chip: every chip is repeated (np.repeat)
+    # - fractional samples_per_chip: a phase accumulator advances by
+    #   1/samples_per_chip chips per sample
+    #     sample n takes chip floor(n / samples_per_chip)
+    #     output has round(len(chips) * samples_per_chip) samples
+    #   so non-integer rates need no adjust_sample_rate search
+    def upsample_chips(self, chips, samples_per_chip):
+        chips = np.asarray(chips, dtype=np.int8)
+        if(samples_per_chip == int(samples_per_chip)):
+            return np.repeat(chips, int(samples_per_chip))
+        Ns = int(round(len(chips) * samples_per_chip))
+        chip_idx = np.floor(np.arange(Ns) / samples_per_chip).astype(np.int64)
+        return chips[np.minimum(chip_idx, len(chips)-1)]
+
     # create C/A code array, stretched to length of carrier
     def generate_ca_code(self,chip_number, cycles_per_chip, sample_factor):
         
         # Generate GPS C/A Code 
-        ca = gp.generate_prn(1,chip_number)
+        ca = gp.ca_code(1,chip_number)
 
         # Stretch C/A code out by factor of length difference to carrier 
         # chip length: cycles_per_chip * sample_rate
-        c_a = []
-        for i in ca:
-            for j in range(int(cycles_per_chip*sample_factor)):
-                c_a.append(i)
-        return c_a
+        return self.upsample_chips(ca, cycles_per_chip*sample_factor)
     
     # create C/A code array, stretched to length of carrier
     def gen_ca_code(self,chip_number, prn_sample_factor):
         
         # Generate GPS C/A Code 
-        ca = gp.generate_prn(1,chip_number)
+        ca = gp.ca_code(1,chip_number)
 
         # Stretch C/A code out by factor of length difference to carrier 
         # chip length: cycles_per_chip * sample_rate
-        c_a = []
-        for i in ca:
-            for j in range(int(prn_sample_factor)):
-                c_a.append(i)
-        return c_a
+        return self.upsample_chips(ca, prn_sample_factor)
 
     def gen_boc_code(self, boc_phase, boc_chip_number, boc_sample_factor):
         # generate boc +1/ -1 signal
-        boc_l = []
-        for i in range(boc_chip_number):
-            if(boc_phase == 0):     # sin phase (start at -1)
-                if(i % 2 == 0):
-                    boc_l.append(-1)
-                else:
-                    boc_l.append(1)
-            else:                   # cosine phase (start at +1)
-                if(i % 2 == 0):
-                    boc_l.append(1)
-                else:
-                    boc_l.append(-1)
+        #   sin phase (boc_phase == 0) starts at -1, cosine phase at +1
+        boc_l = np.ones(boc_chip_number, dtype=np.int8)
+        boc_l[0::2] = -1
+        if(boc_phase != 0): boc_l = -boc_l
         # stretch by boc_sample_factor
-        boc = []
-        for i in boc_l:
-            for j in range(int(boc_sample_factor)):
-                boc.append(i)
-        return boc
+        return self.upsample_chips(boc_l, boc_sample_factor)
 
 
     # convert binary (1/0) square wave to (+1/ -1)
@@ -337,4 +415,647 @@ class util:
             if( omi_h < (m-1)):
                 omi_h += 1
 
-        return conv
\ No newline at end of file
+        return conv
+
+    # choose an FFT size for block convolution with an 'm' sample kernel
+    #   - power of two, at least 2m so each block keeps >= m+1 new samples
+    #   - minimizes FFT work per output sample: nfft*log2(nfft)/(nfft-m+1)
+    def fft_block_size(self, m, n=None):
+        nfft = 1 << int(np.ceil(np.log2(2*m)))
+        # no point in blocks longer than the whole output
+        nfft_max = 1<<22
+        if(n is not None): nfft_max = min(nfft_max, 1 << int(np.ceil(np.log2(n+m-1))))
+
+        best, best_cost = nfft, np.inf
+        while(1):
+            cost = nfft * np.log2(nfft) / (nfft - m + 1)
+            if(cost < best_cost): best, best_cost = nfft, cost
+            if(nfft >= nfft_max): return best
+            nfft *= 2
+
+    # single FFT convolution of two real signals
+    def fft_convolve(self, x_n, h_m):
+        x_n = np.asarray(x_n, dtype=np.float64)
+        h_m = np.asarray(h_m, dtype=np.float64)
+        conv_len = len(x_n) + len(h_m) - 1
+        nfft = 1 << int(np.ceil(np.log2(conv_len)))
+        return np.fft.irfft(np.fft.rfft(x_n, nfft) * np.fft.rfft(h_m, nfft), nfft)[:conv_len]
+
+    # overlap-add FFT convolution
+    #   - x_n is cut into blocks of L = nfft-m+1 samples
+    #   - each block is convolved with h_m through one nfft-point FFT
+    #     (all blocks of a group in one batched rfft call)
+    #   - the m-1 sample tail of each block is added onto the next block
+    def overlap_add_convolve(self, x_n, h_m, nfft=None, group=256):
+        x_n = np.asarray(x_n, dtype=np.float64)
+        h_m = np.asarray(h_m, dtype=np.float64)
+        n = len(x_n)
+        m = len(h_m)
+        if(nfft is None): nfft = self.fft_block_size(m, n)
+        L = nfft - m + 1
+        H = np.fft.rfft(h_m, nfft)
+
+        # zero pad signal to a whole number of blocks
+        n_blocks = -(-n // L)
+        x_p = np.zeros(n_blocks * L)
+        x_p[:n] = x_n
+        x_p = x_p.reshape(n_blocks, L)
+
+        # one extra block holds the final tail
+        conv = np.zeros((n_blocks + 1, L))
+        for g in range(0, n_blocks, group):
+            blocks = np.fft.irfft(np.fft.rfft(x_p[g:g+group], nfft, axis=1) * H, nfft, axis=1)
+            conv[g:g+len(blocks)] += blocks[:, :L]
+            conv[g+1:g+1+len(blocks), :m-1] += blocks[:, L:]
+        return conv.reshape(-1)[:n+m-1]
+
+    # overlap-save framing of the last axis of x_n for an 'm' tap kernel
+    #   - x_n is padded with m-1 zeros on each side and cut into
+    #     overlapping frames of nfft samples, hopping L = nfft-m+1
+    #   - returns the (..., n_blocks, nfft) frames and L, frames are strided
+    #     views of the padded copy, frame k gives outputs k*L to (k+1)*L-1
+    def overlap_save_frames(self, x_n, m, nfft):
+        n = x_n.shape[-1]
+        L = nfft - m + 1
+        n_blocks = -(-(n + m - 1) // L)
+        x_p = np.zeros(x_n.shape[:-1] + ((n_blocks - 1) * L + nfft,))
+        x_p[..., m-1:m-1+n] = x_n
+        frames = np.lib.stride_tricks.sliding_window_view(x_p, nfft, axis=-1)[..., ::L, :]
+        return frames, L
+
+    # overlap-save FFT convolution
+    #   - frames from overlap_save_frames, no copy is made before the FFT
+    #   - the first m-1 (circularly wrapped) outputs of each frame are dropped
+    def overlap_save_convolve(self, x_n, h_m, nfft=None, group=256):
+        x_n = np.asarray(x_n, dtype=np.float64)
+        h_m = np.asarray(h_m, dtype=np.float64)
+        n = len(x_n)
+        m = len(h_m)
+        if(nfft is None): nfft = self.fft_block_size(m, n)
+        H = np.fft.rfft(h_m, nfft)
+
+        conv_len = n + m - 1
+        frames, L = self.overlap_save_frames(x_n, m, nfft)
+        n_blocks = len(frames)
+
+        conv = np.empty((n_blocks, L))
+        for g in range(0, n_blocks, group):
+            blocks = np.fft.irfft(np.fft.rfft(frames[g:g+group], axis=1) * H, nfft, axis=1)
+            conv[g:g+len(blocks)] = blocks[:, m-1:]
+        return conv.reshape(-1)[:conv_len]
+
+    # convolve two real signals, picking the engine by size
+    #   - 'direct'  : np.convolve, O(N*M), best for short kernels
+    #   - 'fft'     : one FFT over the whole output
+    #   - 'oa'/'os' : overlap-add/ overlap-save, O(N*log M) for long signals
+    #   - 'auto'    : direct for short kernels, overlap-save when one signal
+    #                 is much longer than the other, otherwise a single FFT
+    def fast_convolve(self, x_n, h_m, method='auto'):
+        n = len(x_n)
+        m = len(h_m)
+        # the shorter signal is treated as the kernel
+        if(m > n):
+            x_n, h_m, n, m = h_m, x_n, m, n
+
+        if(method == 'auto'):
+            if(m <= 64 or n * m <= 1<<16): method = 'direct'
+            elif(n > 8 * m): method = 'os'
+            else: method = 'fft'
+
+        if(method == 'direct'): return np.convolve(x_n, h_m)
+        elif(method == 'fft'):  return self.fft_convolve(x_n, h_m)
+        elif(method == 'oa'):   return self.overlap_add_convolve(x_n, h_m)
+        elif(method == 'os'):   return self.overlap_save_convolve(x_n, h_m)
+        raise ValueError("unknown convolution method: %s" % method)
+
+    # stack K kernels of (possibly) different lengths into a zero padded
+    #   (K, M_max) array, also returns the individual lengths
+    def stack_kernels(self, kernels):
+        lengths = [len(h) for h in kernels]
+        bank = np.zeros((len(kernels), max(lengths)))
+        for k, h in enumerate(kernels):
+            bank[k, :lengths[k]] = h
+        return bank, lengths
+
+    # filter bank, K kernels applied to one signal
+    #   - returns a (K, N + M_max - 1) array, row k is the convolution with
+    #     kernels[k] (samples past N + M_k - 1 are zero)
+    #   - float: overlap-save, each signal frame is FFT'd once and multiplied
+    #            by all K cached kernel spectra in one 2-D operation
+    #   - fixed_point: bit-exact fpga_convolve for every kernel, the tap loop
+    #            runs once over M_max taps with all K kernels per tap
+    #            (FFT products can't reproduce the per-product floor shift)
+    def filter_bank(self, x_n, kernels, fixed_point=False, nfft=None, group=256, block_size=1<<16):
+        bank, lengths = self.stack_kernels(kernels)
+        K, m = bank.shape
+        x_n = np.asarray(x_n)
+        n = len(x_n)
+        conv_len = n + m - 1
+
+        if(fixed_point):
+            if(x_n.dtype.kind not in 'iu'):
+                x_n = x_n.astype(np.float64)
+            h_i = self.fpga_quantize_kernel(bank)
+            conv = np.zeros((K, conv_len), dtype=np.int64)
+            for start in range(0, n, block_size):
+                x_b = x_n[start:start+block_size]
+                nb = len(x_b)
+                for k in range(m):
+                    conv[:, start+k:start+k+nb] += self.fpga_tap_products(x_b[None, :], h_i[:, k, None])
+            return conv.astype(np.float64)
+
+        x_n = x_n.astype(np.float64)
+        if(nfft is None): nfft = self.fft_block_size(m, n)
+        H = np.fft.rfft(bank, nfft, axis=1)
+
+        frames, L = self.overlap_save_frames(x_n, m, nfft)
+        n_blocks = len(frames)
+
+        # keep the (group, K, nfft) intermediate about the size overlap_save uses
+        group = max(1, group // K)
+        conv = np.empty((K, n_blocks, L))
+        for g in range(0, n_blocks, group):
+            X = np.fft.rfft(frames[g:g+group], axis=1)
+            blocks = np.fft.irfft(X[:, None, :] * H[None, :, :], nfft, axis=2)
+            conv[:, g:g+len(blocks)] = blocks[:, :, m-1:].transpose(1, 0, 2)
+        conv = conv.reshape(K, -1)[:, :conv_len]
+        for k in range(K):
+            conv[k, n+lengths[k]-1:] = 0
+        return conv
+
+    # direct-form convolution, summing one kernel tap at a time over the
+    #   whole signal (same tap order as StreamingFIR, so results match
+    #   bit for bit however the signal was chunked)
+    def fir_convolve(self, x_n, h_m):
+        x_n = np.asarray(x_n, dtype=np.float64)
+        h_m = np.asarray(h_m, dtype=np.float64)
+        n = len(x_n)
+        conv = np.zeros(n+len(h_m)-1)
+        for k in range(len(h_m)):
+            conv[k:k+n] += h_m[k] * x_n
+        return conv
+
+    # - convolve lanes of a multi-lane signal with their kernels
+    # - lanes:   (N_paths, L) array (or list of equal length lanes)
+    # - kernels: one kernel for every lane, or (N_k, M) array of kernels
+    # - pairs:   list of (lane, kernel) index pairs to convolve,
+    #            defaults to lane i with kernel i (or the single kernel)
+    # - workers: > 1 runs the pairs in a process pool; lanes, kernels and
+    #            results live in shared memory, so only names/ shapes are
+    #            sent to the workers instead of pickled arrays
+    # - returns a (len(pairs), L+M-1) array
+    def lane_convolve(self, lanes, kernels, pairs=None, workers=None):
+        lanes = np.atleast_2d(np.asarray(lanes, dtype=np.float64))
+        kernels = np.atleast_2d(np.asarray(kernels, dtype=np.float64))
+        if(pairs is None):
+            pairs = [(i, i if len(kernels) > 1 else 0) for i in range(len(lanes))]
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        conv_len = lanes.shape[1] + kernels.shape[1] - 1
+
+        if(workers is None or workers <= 1 or len(pairs) <= 1):
+            conv = np.empty((len(pairs), conv_len))
+            for i, (lane, kern) in enumerate(pairs):
+                conv[i] = self.fast_convolve(lanes[lane], kernels[kern])
+            return conv
+
+        shm = []
+        try:
+            # copy inputs into shared memory once, allocate shared output
+            specs = []
+            for arr in (lanes, kernels, np.empty((len(pairs), conv_len))):
+                block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                shm.append(block)
+                np.ndarray(arr.shape, dtype=np.float64, buffer=block.buf)[:] = arr
+                specs.append((block.name, arr.shape))
+
+            # split pairs evenly across workers
+            tasks = np.array_split(np.arange(len(pairs)), min(workers, len(pairs)))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_lane_convolve_worker, specs, pairs[task], task) for task in tasks]
+                for future in futures: future.result()
+
+            out = specs[2]
+            return np.ndarray(out[1], dtype=np.float64, buffer=shm[2].buf).copy()
+        finally:
+            for block in shm:
+                block.close()
+                block.unlink()
+
+    # - polyphase (multi-lane) convolution of a signal with a full-rate kernel
+    # - the signal and kernel are each split across N_lanes lanes:
+    #     x_p[a] = x[a*N + p]     h_q[b] = h[b*N + q]
+    # - output lane r sums the lane-pair convolutions x_p ** h_q with
+    #   (p + q) % N == r:
+    #     p <= r  -> current sample of x_p ** h_q
+    #     p >  r  -> previous sample of x_p ** h_q (the carry into the next clock)
+    #   this is the same current/ previous sum done by multi_lane_sum.vhd
+    # - the sum is done in the frequency domain, the carry is a one-sample
+    #   delay of the lane kernel:
+    #     Y_r = sum_p X_p * G_rp,   g_rp = h_((r-p)%N), delayed by one when p > r
+    #   each lane is cut into overlap-save blocks sized from the Lh+1 tap
+    #   lane kernels, so memory stays at a few blocks per lane and only N
+    #   inverse FFTs run per block
+    # - returns the full-rate output (same as np.convolve(signal, kernel)),
+    #   with return_lanes: also the sub-convolutions (N, N, Lc) and the
+    #   per-lane outputs (N, Lc+1) before they are interleaved
+    #   (the N x N sub-convolutions are only built when asked for)
+    # - workers > 1 computes the sub-convolutions in a process pool
+    #   (see lane_convolve) instead of the block FFT
+    def polyphase_convolve(self, signal, kernel, N_lanes, return_lanes=False, workers=None, group=256):
+        signal = np.asarray(signal, dtype=np.float64)
+        kernel = np.asarray(kernel, dtype=np.float64)
+        Ns = len(signal)
+        Nk = len(kernel)
+        N = N_lanes
+
+        # zero pad both to a whole number of lane samples, then split lanes
+        x_l = self.split_lanes(signal, N, pad=True)
+        h_l = self.split_lanes(kernel, N, pad=True)
+        Lx = x_l.shape[1]
+        Lh = h_l.shape[1]
+        Lc = Lx + Lh - 1
+
+        if(return_lanes or (workers is not None and workers > 1)):
+            lane_conv = self.polyphase_lane_convolve(x_l, h_l, workers)
+            # output lane r <- pairs (p, (r - p) % N), delayed by one when p > r
+            p_idx, r_idx = np.meshgrid(np.arange(N), np.arange(N), indexing='ij')
+            pairs = lane_conv[p_idx, (r_idx - p_idx) % N]
+            carry = (p_idx > r_idx)[:, :, None]
+            lane_out = np.zeros((N, Lc + 1))
+            lane_out[:, :Lc] += np.where(carry, 0, pairs).sum(axis=0)
+            lane_out[:, 1:] += np.where(carry, pairs, 0).sum(axis=0)
+        else:
+            lane_out = self.polyphase_lane_outputs(x_l, h_l, group)
+
+        # interleave lanes back to full rate
+        conv = self.interleave_lanes(lane_out)[:Ns + Nk - 1]
+        if(return_lanes):
+            return conv, lane_conv, lane_out
+        return conv
+
+    # - per-lane outputs (N, Lx+Lh) of polyphase_convolve, overlap-save
+    # - lane kernels g_rp (N, N, Lh+1) are transformed once, each block of
+    #   the N lanes is transformed once and the N x N product is summed
+    #   over the input lanes before the N inverse FFTs
+    def polyphase_lane_outputs(self, x_l, h_l, group=256):
+        N, Lx = x_l.shape
+        Lh = h_l.shape[1]
+        m = Lh + 1
+        out_len = Lx + Lh
+
+        # g[r][p] = h_((r-p)%N), one sample later when p > r
+        g = np.zeros((N, N, m))
+        for r in range(N):
+            for p in range(N):
+                d = 1 if p > r else 0
+                g[r, p, d:d+Lh] = h_l[(r - p) % N]
+
+        nfft = self.fft_block_size(m, Lx)
+        G = np.fft.rfft(g, nfft, axis=2)
+        frames, L = self.overlap_save_frames(x_l, m, nfft)
+        n_blocks = frames.shape[1]
+
+        # about 'group' FFT frames in flight across all lanes
+        group = max(1, group // N)
+        lane_out = np.empty((N, n_blocks, L))
+        for b in range(0, n_blocks, group):
+            X = np.fft.rfft(frames[:, b:b+group], axis=2)
+            Y = np.einsum('rpf,pbf->rbf', G, X)
+            lane_out[:, b:b+X.shape[1]] = np.fft.irfft(Y, nfft, axis=2)[:, :, m-1:]
+        return lane_out.reshape(N, -1)[:, :out_len]
+
+    # all N x N lane sub-convolutions x_p ** h_q, (N, N, Lx+Lh-1)
+    #   - batched FFT, or a process pool when workers > 1
+    def polyphase_lane_convolve(self, x_l, h_l, workers=None):
+        N, Lx = x_l.shape
+        Lc = Lx + h_l.shape[1] - 1
+        if(workers is not None and workers > 1):
+            pairs = [(p, q) for p in range(N) for q in range(N)]
+            return self.lane_convolve(x_l, h_l, pairs, workers).reshape(N, N, Lc)
+        nfft = 1 << int(np.ceil(np.log2(Lc)))
+        X = np.fft.rfft(x_l, nfft, axis=1)
+        H = np.fft.rfft(h_l, nfft, axis=1)
+        return np.fft.irfft(X[:, None, :] * H[None, :, :], nfft, axis=2)[:, :, :Lc]
+
+    ##############################################
+    ### FFT-domain multi-lane (down-sampled) engine
+    ##############################################
+    # - same lane structure as the hardware: the signal is split across
+    #   N_paths lanes (down_sample_split_path), each lane is filtered with the
+    #   down-sampled kernel and the lane outputs are spliced back together
+    # - every lane is FFT'd in one batched rfft call, multiplied by the cached
+    #   kernel spectrum and inverse transformed in one batched irfft call
+
+    # FFT size for linear (not circular) convolution of Nds lane samples with
+    #   an Ndk tap kernel
+    def lane_fft_size(self, Nds, Ndk):
+        return 1 << int(np.ceil(np.log2(Nds + Ndk - 1)))
+
+    # rfft of a kernel (or an (N_paths, Ndk) array of per-lane kernels),
+    #   computed once per (kernel, nfft) and cached on the object
+    #   - spectra are sized to the whole lane FFT, so only the most recent
+    #     kernel_spectra_max are kept (the util object may be shared,
+    #     e.g. bpsk.sig)
+    def kernel_spectrum(self, kernel, nfft):
+        kernel = np.ascontiguousarray(kernel, dtype=np.float64)
+        key = (kernel.shape, kernel.tobytes(), nfft)
+        if(key not in self.kernel_spectra):
+            while(len(self.kernel_spectra) >= self.kernel_spectra_max):
+                del self.kernel_spectra[next(iter(self.kernel_spectra))]
+            self.kernel_spectra[key] = np.fft.rfft(kernel, nfft, axis=-1)
+        return self.kernel_spectra[key]
+
+    # drop all cached kernel spectra
+    def clear_kernel_spectra(self):
+        self.kernel_spectra.clear()
+
+    # nfft-point rfft of every down-sampled path in one call
+    #   - s_ds is (N_paths, Nds), returns (N_paths, nfft/2+1) and the
+    #     normalized frequency of each bin
+    def fft_down_sampled_paths(self, s_ds, nfft):
+        s_ds = np.asarray(s_ds, dtype=np.float64)
+        f_ds = np.fft.rfft(s_ds, nfft, axis=1)
+        return f_ds, np.fft.rfftfreq(nfft)
+
+    # multiply each path spectrum by the kernel spectrum
+    #   - kernel is one down-sampled kernel shared by all paths, or one per path
+    def filter_down_sampled_paths(self, f_ds, kernel, nfft):
+        return f_ds * self.kernel_spectrum(kernel, nfft)
+
+    # inverse transform every path in one call, keeping 'conv_len' samples
+    def ifft_down_sampled_paths(self, f_ds, nfft, conv_len):
+        return np.fft.irfft(f_ds, nfft, axis=1)[:, :conv_len]
+
+    # - splice per-lane convolutions (N_paths, Lc) back to full rate
+    # - vectorized version of the ramp up/ stream/ ramp down loop in the demos:
+    #     out[N*i + r] = sum(c[p][i], p <= r) + sum(c[p][i-1], p > r)
+    #   (lanes up to r are on the current clock, the rest are carried
+    #    over from the previous clock)
+    # - returns N_paths * (Lc + 1) samples
+    def multi_lane_conv_recon(self, s_ds_conv):
+        s_ds_conv = np.asarray(s_ds_conv, dtype=np.float64)
+        N, Lc = s_ds_conv.shape
+        # running sums over lanes of the current and previous clock
+        c = np.zeros((N, Lc + 1))
+        c[:, :Lc] = s_ds_conv
+        p = np.zeros((N, Lc + 1))
+        p[:, 1:] = s_ds_conv
+        cur = np.cumsum(c, axis=0)
+        prev = p.sum(axis=0) - np.cumsum(p, axis=0)
+        return (cur + prev).T.reshape(-1)
+
+    # - full FFT multi-lane filter: split, batched rfft, cached kernel
+    #   spectrum, batched irfft, splice
+    # - kernel_ds is the down-sampled kernel applied to every lane
+    #   (or an (N_paths, Ndk) array, one kernel per lane)
+    # - matches np.convolve of each lane followed by multi_lane_conv_recon
+    # - with return_lanes, also returns the per-lane convolutions
+    def fft_multi_lane_convolve(self, signal, kernel_ds, N_paths, return_lanes=False):
+        s_ds = self.split_lanes(signal, N_paths, pad=True)
+        Nds = s_ds.shape[1]
+        Ndk = np.shape(kernel_ds)[-1]
+        conv_ds_len = Nds + Ndk - 1
+        nfft = self.lane_fft_size(Nds, Ndk)
+
+        f_ds, _ = self.fft_down_sampled_paths(s_ds, nfft)
+        f_ds = self.filter_down_sampled_paths(f_ds, kernel_ds, nfft)
+        s_ds_conv = self.ifft_down_sampled_paths(f_ds, nfft, conv_ds_len)
+
+        conv = self.multi_lane_conv_recon(s_ds_conv)
+        if(return_lanes):
+            return conv, s_ds_conv
+        return conv
+
+    # quantize a signal to a FixedPoint array (Q1.(Nr-1) by default)
+    def to_fixed(self, signal, Nr=None, rounding='truncate', saturate=True):
+        if(Nr is None): Nr = self.Nr
+        return FixedPoint.from_float(signal, Nr, Nr-1, rounding, saturate)
+
+    # - convolve FixedPoint samples with a FixedPoint kernel, tracking bit growth
+    # - fpga=True:  each product is floor shifted by the kernel's fraction bits
+    #               (fpga_convolve arithmetic), output keeps x_fp's fraction bits
+    # - fpga=False: full precision products, fraction bits add up
+    # - the output word length is sized from the worst case input
+    #   (|x| = 2^(Wx-1)) times the kernel's absolute sum
+    def fixed_convolve(self, x_fp, h_fp, fpga=True):
+        x = x_fp.data
+        h = h_fp.data.astype(np.int64)
+        n = len(x)
+        conv = np.zeros(n+len(h)-1, dtype=np.int64)
+
+        # worst case output magnitude in output LSBs
+        h_abs_sum = int(np.abs(h).sum())
+        if(fpga):
+            frac_bits = x_fp.frac_bits
+            bound = ((h_abs_sum << (x_fp.word_len-1)) >> h_fp.frac_bits) + len(h)
+            for k in range(len(h)):
+                conv[k:k+n] += self.fpga_tap_products(x, h[k], h_fp.frac_bits)
+        else:
+            frac_bits = x_fp.frac_bits + h_fp.frac_bits
+            bound = h_abs_sum << (x_fp.word_len-1)
+            for k in range(len(h)):
+                conv[k:k+n] += x.astype(np.int64) * h[k]
+
+        word_len = max(bound.bit_length() + 1, x_fp.word_len)
+        return FixedPoint(conv, word_len, frac_bits)
+
+    # quantize the kernel once the same way fpga_fractional_mult does
+    #   y_i = floor(y_m * (2^30 - 1))
+    def fpga_quantize_kernel(self, h_m):
+        Nd = 15                 ## max right shift for samples
+        Ndy = 2 * Nd            ## proper scaling resolution
+        return np.floor(np.asarray(h_m, dtype=np.float64) * (pow(2,Ndy) - 1)).astype(np.int64)
+
+    # products of x_n with one quantized kernel tap, followed by the
+    #   floor right shift - matches int(x_n * y_i) >> Ndy
+    #   (y_i may also be an array of taps broadcast against x_n)
+    def fpga_tap_products(self, x_n, y_i, Ndy=30):
+        if(x_n.dtype.kind in 'iu'):
+            prod = x_n.astype(np.int64) * y_i
+        else:
+            prod = np.trunc(x_n * np.asarray(y_i, dtype=np.float64)).astype(np.int64)
+        return prod >> Ndy
+
+    # - vectorized, bit-exact version of fpga_convolve
+    # - the kernel is quantized once, then each tap's products
+    #   are computed over a block of 'block_size' samples as int64
+    #   and summed into the output with the same floor-shift semantics
+    def fpga_convolve_fast(self, x_n, h_m, block_size=1<<18):
+        x_n = np.asarray(x_n)
+        if(x_n.dtype.kind not in 'iu'):
+            x_n = x_n.astype(np.float64)
+        h_i = self.fpga_quantize_kernel(h_m)
+        n = len(x_n)
+        m = len(h_i)
+
+        # result is of length N + M - 1
+        conv = np.zeros(n+m-1, dtype=np.int64)
+
+        for start in range(0, n, block_size):
+            x_b = x_n[start:start+block_size]
+            nb = len(x_b)
+            for k in range(m):
+                conv[start+k:start+k+nb] += self.fpga_tap_products(x_b, h_i[k])
+
+        return conv.astype(np.float64)
+
+
+## process pool worker for util.lane_convolve
+##  - attaches to the shared lanes/ kernels/ output blocks by name
+##  - writes the convolution of each (lane, kernel) pair into its output row
+def _lane_convolve_worker(specs, pairs, rows):
+    shm = [shared_memory.SharedMemory(name=name) for name, shape in specs]
+    try:
+        lanes, kernels, conv = [np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+                                for block, (name, shape) in zip(shm, specs)]
+        s = util()
+        for row, (lane, kern) in zip(rows, pairs):
+            conv[row] = s.fast_convolve(lanes[lane], kernels[kern])
+        del lanes, kernels, conv
+    finally:
+        for block in shm: block.close()
+
+
+## Streaming FIR filter for chunked sample input
+##  - holds the kernel (e.g. from filter_gen.filter) and the last M-1
+##    input samples between calls
+##  - process(chunk) returns len(chunk) output samples, flush() returns
+##    the final M-1 samples; concatenated, they are identical to the one-shot
+##    util.fir_convolve (or util.fpga_convolve when fixed_point)
+class StreamingFIR:
+
+    def __init__(self, kernel, fixed_point=False):
+        self.sig = util()
+        self.kernel = np.asarray(kernel, dtype=np.float64)
+        self.fixed_point = fixed_point
+        self.Nk = len(self.kernel)
+
+        # fpga arithmetic works on the quantized kernel
+        if(fixed_point):
+            self.kernel_i = self.sig.fpga_quantize_kernel(self.kernel)
+
+        self.reset()
+
+    # clear the filter history (back to all zeros)
+    def reset(self):
+        self.state = np.zeros(self.Nk - 1)
+        self.samples_in = 0
+
+    def process(self, chunk):
+        chunk = np.asarray(chunk)
+        if(chunk.dtype.kind in 'iu' and self.fixed_point and self.samples_in == 0):
+            self.state = self.state.astype(np.int64)
+        elif(chunk.dtype.kind not in 'iu'):
+            chunk = chunk.astype(np.float64)
+
+        Nc = len(chunk)
+        if(Nc == 0): return np.zeros(0)
+
+        # previous M-1 samples followed by the new chunk
+        buf = np.concatenate((self.state, chunk))
+
+        # taps are summed in the same order as the one-shot engines,
+        #   so results do not depend on how the input was chunked
+        if(self.fixed_point):
+            out = np.zeros(Nc, dtype=np.int64)
+            for k in range(self.Nk):
+                start = self.Nk - 1 - k
+                out += self.sig.fpga_tap_products(buf[start:start+Nc], self.kernel_i[k])
+            out = out.astype(np.float64)
+        else:
+            out = np.zeros(Nc)
+            for k in range(self.Nk):
+                start = self.Nk - 1 - k
+                out += self.kernel[k] * buf[start:start+Nc]
+
+        self.state = buf[len(buf)-(self.Nk-1):]
+        self.samples_in += Nc
+        return out
+
+    # push M-1 zeros through the filter to get the convolution tail
+    def flush(self):
+        out = self.process(np.zeros(self.Nk - 1, dtype=self.state.dtype))
+        self.reset()
+        return out
+
+## Fixed-point sample array
+##  - integer storage, the smallest of int16/ int32/ int64 holding word_len bits
+##    (4x smaller than the float64 arrays for 16-bit samples)
+##  - Q-format metadata: word_len bits including sign, frac_bits fraction bits
+##      real value = data / 2^frac_bits
+##  - np.asarray(fp) gives the raw integer samples, for frac_bits = Nr-1
+##    these are the same values scale_signal produces
+class FixedPoint:
+
+    def __init__(self, data, word_len=16, frac_bits=None):
+        if(frac_bits is None): frac_bits = word_len - 1
+        self.word_len = word_len
+        self.frac_bits = frac_bits
+        self.data = np.asarray(data).astype(util().sample_dtype(word_len), copy=False)
+        self.clipped = 0
+
+    # quantize float values to Q(word_len-frac_bits).(frac_bits)
+    #   rounding/ saturate are the same as util.quantize_signal
+    @classmethod
+    def from_float(cls, values, word_len=16, frac_bits=None, rounding='truncate', saturate=True):
+        if(frac_bits is None): frac_bits = word_len - 1
+        # quantize_signal scales by 2^(word_len-1), adjust to 2^frac_bits
+        values = np.asarray(values, dtype=np.float64) * 2.0**(frac_bits - (word_len-1))
+        data, clipped = util().quantize_signal(values, word_len, rounding, saturate)
+        fp = cls(data, word_len, frac_bits)
+        fp.clipped = clipped
+        return fp
+
+    def to_float(self):
+        return self.data / 2.0**self.frac_bits
+
+    # - change the Q-format, dropping (or adding) fraction bits
+    # - rounding: 'floor' (arithmetic right shift, what the FPGA does),
+    #   'truncate' (toward zero) or 'convergent' (round half to even)
+    # - saturate/ wrap to the new word length, self.clipped counts overflows
+    def requantize(self, word_len, frac_bits=None, rounding='floor', saturate=True):
+        if(frac_bits is None): frac_bits = word_len - 1
+        data = self.data.astype(np.int64)
+        shift = self.frac_bits - frac_bits
+        if(shift > 0):
+            res = data >> shift
+            rem = data - (res << shift)
+            if(rounding == 'truncate'):
+                res += (rem != 0) & (data < 0)
+            elif(rounding == 'convergent'):
+                half = 1 << (shift-1)
+                res += (rem > half) | ((rem == half) & (res & 1 == 1))
+            elif(rounding != 'floor'):
+                raise ValueError("unknown rounding mode: %s" % rounding)
+            data = res
+        elif(shift < 0):
+            data = data << -shift
+
+        lo = -(1 << (word_len-1))
+        hi = (1 << (word_len-1)) - 1
+        clipped = int(np.count_nonzero((data > hi) | (data < lo)))
+        if(saturate): data = np.clip(data, lo, hi)
+        else:         data = (data - lo) % (1 << word_len) + lo
+        fp = FixedPoint(data, word_len, frac_bits)
+        fp.clipped = clipped
+        return fp
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __array__(self, dtype=None, copy=None):
+        if(dtype is None): return self.data
+        return self.data.astype(dtype)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        if(isinstance(idx, slice)):
+            return FixedPoint(self.data[idx], self.word_len, self.frac_bits)
+        return self.data[idx]
+
+    def __repr__(self):
+        return "FixedPoint(Q%d.%d, %s, %d samples)" % (self.word_len - self.frac_bits, self.frac_bits,
+                                                      self.data.dtype, len(self.data))
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import zlib as z
+
+import numpy as np
+import crc_parallelization as crc
+
+## Benchmark + conformance suite for crc_parallelization
+##  - every engine is cross-checked against zlib.crc32 on random inputs
+##  - every engine is timed over sizes from 64 B up to --max-size (1 GB),
+##    slow engines stop at their own size cap
+##  - results are written as JSON so runs can be compared between versions
+##
+## usage:
+##  python crc_benchmark.py -o crc_bench.json
+##  python crc_benchmark.py -o new.json --compare old.json
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+## 64 B, 256 B, 1 KB ... 1 GB
+SIZES = [64 * 4**i for i in range(13)]
+
+## tables are built once, outside of the timed region
+_forward_table = crc.generate_crc32_table()
+_reciprocal_table = crc.gen_crc_32_reciprocal_table()
+
+def _hasher(data):
+    hasher = crc.CRC32()
+    hasher.update(data)
+    return hasher.crc
+
+## crc_32_batch is timed over 64 byte frames (one CRC per frame)
+BATCH_FRAME = 64
+
+def _batch(data):
+    frames = np.frombuffer(data, dtype=np.uint8).reshape(-1, BATCH_FRAME)
+    return crc.crc_32_batch(frames)
+
+## name -> (engine(data) -> int, largest size to time)
+ENGINES = {
+    'zlib.crc32':              (z.crc32,                                                    GB),
+    'crc_32':                  (crc.crc_32,                                                 256 * KB),
+    'crc_32_reciprocal':       (crc.crc_32_reciprocal,                                      256 * KB),
+    'crc_32_reciprocol_table': (lambda data: crc.crc_32_reciprocol_table(data, _reciprocal_table), 16 * MB),
+    'ethernet_crc32':          (lambda data: crc.ethernet_crc32(data, _forward_table),      4 * MB),
+    'ethernet_crc32_fast':     (lambda data: crc.ethernet_crc32_fast(data, _forward_table), 16 * MB),
+    'crc_32_slice_by_8':       (crc.crc_32_slice_by_8,                                      16 * MB),
+    'crc_32_slice_by_16':      (crc.crc_32_slice_by_16,                                     16 * MB),
+    'crc_compute':             (lambda data: crc.crc_compute(data, 'CRC-32/ISO-HDLC'),      16 * MB),
+    'CRC32':                   (_hasher,                                                    16 * MB),
+    'parallel_crc32':          (crc.parallel_crc32,                                         GB),
+    'crc_32_lanes_4':          (lambda data: crc.crc_32_lanes(data, 4),                     16 * MB),
+    'crc_32_lanes_8':          (lambda data: crc.crc_32_lanes(data, 8),                     16 * MB),
+    'crc_32_lanes_16':         (lambda data: crc.crc_32_lanes(data, 16),                    16 * MB),
+    'crc_32_lanes_32':         (lambda data: crc.crc_32_lanes(data, 32),                    16 * MB),
+    'crc_32_lanes_model':      (lambda data: crc.crc_32_lanes_model(data, 8),               256 * KB),
+}
+
+## Cross-check each engine against zlib.crc32 on random inputs
+def conformance(engines, trials=200, max_len=300, seed=0):
+    rng = random.Random(seed)
+    lengths = [0, 1, 7, 8, 9, 15, 16, 17] + [rng.randrange(max_len) for i in range(trials)]
+    results = {}
+    for name, (engine, cap) in engines.items():
+        failures = []
+        for length in lengths:
+            data = rng.randbytes(length)
+            ref = z.crc32(data)
+            res = engine(data)
+            if res != ref:
+                failures.append({'len': length, 'expected': ref, 'got': res})
+        results[name] = {'pass': not failures, 'trials': len(lengths), 'failures': failures[:5]}
+
+    ## batch engine, checked frame by frame
+    failures = []
+    for length in lengths[:20]:
+        frames = np.frombuffer(rng.randbytes(16 * length), dtype=np.uint8).reshape(16, length)
+        for frame, res in zip(frames, crc.crc_32_batch(frames)):
+            if int(res) != z.crc32(frame.tobytes()):
+                failures.append({'len': length, 'expected': z.crc32(frame.tobytes()), 'got': int(res)})
+    results['crc_32_batch'] = {'pass': not failures, 'trials': 16 * 20, 'failures': failures[:5]}
+    return results
+
+## Time each engine over each size, returns a list of result records
+def benchmark(engines, sizes, repeat=3, batch=True):
+    data = os.urandom(max(sizes))
+    view = memoryview(data)
+    results = []
+    if batch:
+        engines = dict(engines, crc_32_batch=(_batch, 16 * MB))
+    for name, (engine, cap) in engines.items():
+        for size in sizes:
+            if size > cap:
+                continue
+            chunk = view[:size].tobytes()
+            best = float('inf')
+            for i in range(repeat):
+                start = time.perf_counter()
+                engine(chunk)
+                best = min(best, time.perf_counter() - start)
+            results.append({'engine': name, 'size': size, 'seconds': best,
+                            'mb_per_s': (size / MB) / best if best > 0 else float('inf')})
+            print("%-24s %12d B %10.2f MB/s" % (name, size, results[-1]['mb_per_s']))
+    return results
+
+## Print throughput change vs. a previous results file
+def compare(results, previous):
+    prev = {(r['engine'], r['size']): r['mb_per_s'] for r in previous['benchmark']}
+    for r in results['benchmark']:
+        key = (r['engine'], r['size'])
+        if key in prev and prev[key] > 0:
+            print("%-24s %12d B %+8.1f %%" % (r['engine'], r['size'], 100 * (r['mb_per_s'] / prev[key] - 1)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CRC-32 benchmark and conformance suite")
+    parser.add_argument('-o', '--output', default='crc_bench.json', help="JSON results file")
+    parser.add_argument('--max-size', type=int, default=GB, help="largest input size in bytes")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per size (best is kept)")
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--no-batch', action='store_true', help="skip the crc_32_batch timing")
+    parser.add_argument('--compare', help="previous JSON results file to compare against")
+    parser.add_argument('--conformance-only', action='store_true')
+    args = parser.parse_args(argv)
+
+    engines = {name: ENGINES[name] for name in args.engines}
+    sizes = [size for size in SIZES if size <= args.max_size]
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'conformance': conformance(engines),
+        'benchmark': [],
+    }
+    for name, res in results['conformance'].items():
+        print("%-24s %s" % (name, 'PASS' if res['pass'] else 'FAIL'))
+
+    if not args.conformance_only:
+        results['benchmark'] = benchmark(engines, sizes, args.repeat, not args.no_batch)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    return 0 if all(res['pass'] for res in results['conformance'].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
-import math as m
-import numpy as np 
 import zlib as z
+import struct
+import os
+import mmap
+from collections import namedtuple
+
+## numpy (batch/ array functions) and concurrent.futures (parallel_crc32)
+##  are imported where they are used, so importing this module stays cheap.
+##  All lookup tables are built on first use.
 
 ## In order to process a CRC-32 calculation of a running byte stream
 ##  there is a four step process
@@ -40,6 +46,55 @@ def endian_swap(data):
 def endian_swap_list(data):
     return [endian_swap(word) for word in data]
 
+## Generate table of bit-reversed bytes (256 entries)
+def gen_bit_reverse_table():
+    return [reverse_bits_in_byte(byte) for byte in range(256)]
+
+## bit reverse table is only built once, as a list and as a
+##  bytes.translate() table
+_bit_reverse_table = []
+_bit_reverse_bytes = b''
+
+def get_bit_reverse_table():
+    global _bit_reverse_bytes
+    if not _bit_reverse_table:
+        _bit_reverse_table.extend(gen_bit_reverse_table())
+        _bit_reverse_bytes = bytes(_bit_reverse_table)
+    return _bit_reverse_table
+
+## table-driven versions of reverse_bits_in_byte/ reverse_bits_32bit
+def reverse_bits_in_byte_table(byte_value: int) -> int:
+    return get_bit_reverse_table()[byte_value & 0xff]
+
+def reverse_bits_32bit_table(n: int) -> int:
+    rev = get_bit_reverse_table()
+    return ((rev[n & 0xff] << 24) | (rev[(n >> 8) & 0xff] << 16) |
+            (rev[(n >> 16) & 0xff] << 8) | rev[(n >> 24) & 0xff])
+
+## reverse the bits of every element of an unsigned integer array
+##  - uint8 arrays are a single table gather
+##  - wider words reverse each byte, then swap the byte order
+def reverse_bits_array(data):
+    import numpy as np
+    data = np.asarray(data)
+    if data.dtype.kind != 'u':
+        raise ValueError("reverse_bits_array needs an unsigned integer array")
+    rev = np.array(get_bit_reverse_table(), dtype=np.uint8)
+    data = np.ascontiguousarray(data)
+    if data.dtype.itemsize == 1:
+        return rev[data]
+    return rev[data.view(np.uint8)].view(data.dtype).byteswap()
+
+## endian swap every 32-bit word of an array (vectorized endian_swap_list)
+def endian_swap_array(data):
+    import numpy as np
+    return np.asarray(data, dtype=np.uint32).byteswap()
+
+## Bit reverse every byte of a buffer in one pass (C speed bytes.translate)
+def reverse_bits_bytes(data):
+    get_bit_reverse_table()
+    return _byte_view(data).tobytes().translate(_bit_reverse_bytes)
+
 ## Basic algorithm:
 ##  1. append 8 zeros to the input data
 ##  2. create a zero'd out list of length 8
@@ -137,33 +192,528 @@ def ethernet_crc32(data: bytes, crc_table: list):
         crc = ((crc << 8) & 0xFFFFFFFF) ^ crc_table[table_index]        
     return reverse_bits_32bit(crc) ^ 0xFFFFFFFF
 
-## Test CRC-8 function
-ina = [0b11001001, 0b11001001]
-print("crc-a: ", bin(crc_8(ina,0)))
-
-## Test CRC-8 linearity
-in1 = [0b11001001,0b00000000]
-in2 = [0b00000000,0b11100101]
-in1_xor_in2 = [in1[0], in2[1]]
-crc_a_xor_b = crc_8(in1_xor_in2)
-crc_a_xor_crc_b = crc_8(in1) ^ crc_8(in2)
-print("CRC(a ^ b):")
-print(bin(crc_a_xor_b))
-print("CRC-8(a) ^ CRC-8(b): ")
-print(bin(crc_a_xor_crc_b))
-
-## CRC-32 reciprocol byte
-crc32_in = [0xAA,0xAA,0xAA,0xAA,0xAA,0xAA,0x55,0x55,0x55,0x55,0x55,0x55,0xDD,0xDD,0xDD,0xDD]
-print("crc_32_reciprocol:", hex(crc_32_reciprocal(crc32_in)))
-
-## CRC-32 reciprocol table version
-crc_32_table_r = gen_crc_32_reciprocal_table()
-crc_32_out_r = crc_32_reciprocol_table(crc32_in, crc_32_table_r)
-print("crc_32_recip_table: ", hex(crc_32_out_r))
-
-## CRC-32 forward table version
-crc32_table = generate_crc32_table()
-print("crc-forward: ", hex(ethernet_crc32(crc32_in, crc32_table)))
-
-## CRC-32 direct
-print("crc-no_table: ",hex(crc_32(crc32_in)))
+## Same as ethernet_crc32, with the bit reversals done by table
+##  - input bytes are reversed in one pass before the table loop
+##  - loop body is the same cost as crc_32_reciprocol_table
+def ethernet_crc32_fast(data, crc_table: list):
+    crc = 0xFFFFFFFF
+    for byte in reverse_bits_bytes(data):
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ crc_table[(crc >> 24) ^ byte]
+    return reverse_bits_32bit_table(crc) ^ 0xFFFFFFFF
+
+## Wrap any byte buffer (bytes/ bytearray/ memoryview/ list of ints)
+##  as a flat memoryview of unsigned bytes, without copying when possible
+def _byte_view(data):
+    if isinstance(data, (list, tuple)):
+        data = bytes(data)
+    view = memoryview(data)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+## Generate 'num_tables' CRC-32 reciprocal tables for slicing-by-N
+##  - table[0] is the standard 1-byte table
+##  - table[k][i] is the CRC of byte 'i' followed by 'k' zero bytes
+def gen_crc_32_slicing_tables(num_tables=8):
+    crc_tables = [gen_crc_32_reciprocal_table()]
+    for k in range(1, num_tables):
+        prev = crc_tables[k-1]
+        crc_tables.append([(prev[i] >> 8) ^ crc_tables[0][prev[i] & 0xff] for i in range(256)])
+    return crc_tables
+
+## slicing tables are only built once per table count
+_crc_32_slicing_tables = {}
+
+def get_crc_32_slicing_tables(num_tables=8):
+    if num_tables not in _crc_32_slicing_tables:
+        _crc_32_slicing_tables[num_tables] = gen_crc_32_slicing_tables(num_tables)
+    return _crc_32_slicing_tables[num_tables]
+
+## CRC-32 slicing-by-8
+##  - consume 8 bytes per iteration, the running CRC is XOR'd
+##    into the first 4 bytes (little endian word)
+##  - each of the 8 bytes indexes its own table, results are XOR'd
+##  - 'crc' is a previous CRC-32 result, so calls can be chained
+##    the same way as zlib.crc32(data, crc)
+def crc_32_slice_by_8(data, crc=0):
+    data = _byte_view(data)
+    t0,t1,t2,t3,t4,t5,t6,t7 = get_crc_32_slicing_tables(8)
+    crc ^= 0xffffffff
+    n8 = len(data) - (len(data) % 8)
+    for lo, hi in struct.iter_unpack('<II', data[:n8]):
+        lo ^= crc
+        crc = (t7[lo & 0xff] ^ t6[(lo >> 8) & 0xff] ^ t5[(lo >> 16) & 0xff] ^ t4[lo >> 24] ^
+               t3[hi & 0xff] ^ t2[(hi >> 8) & 0xff] ^ t1[(hi >> 16) & 0xff] ^ t0[hi >> 24])
+    for byte in data[n8:]:
+        crc = (crc >> 8) ^ t0[(byte ^ crc) & 0xff]
+    return crc ^ 0xffffffff
+
+## CRC-32 slicing-by-16
+##  - same as slicing-by-8, with 16 bytes (four 32-bit words) per iteration
+def crc_32_slice_by_16(data, crc=0):
+    data = _byte_view(data)
+    t = get_crc_32_slicing_tables(16)
+    t0,t1,t2,t3,t4,t5,t6,t7 = t[0:8]
+    t8,t9,t10,t11,t12,t13,t14,t15 = t[8:16]
+    crc ^= 0xffffffff
+    n16 = len(data) - (len(data) % 16)
+    for w0, w1, w2, w3 in struct.iter_unpack('<IIII', data[:n16]):
+        w0 ^= crc
+        crc = (t15[w0 & 0xff] ^ t14[(w0 >> 8) & 0xff] ^ t13[(w0 >> 16) & 0xff] ^ t12[w0 >> 24] ^
+               t11[w1 & 0xff] ^ t10[(w1 >> 8) & 0xff] ^ t9[(w1 >> 16) & 0xff]  ^ t8[w1 >> 24] ^
+               t7[w2 & 0xff]  ^ t6[(w2 >> 8) & 0xff]  ^ t5[(w2 >> 16) & 0xff]  ^ t4[w2 >> 24] ^
+               t3[w3 & 0xff]  ^ t2[(w3 >> 8) & 0xff]  ^ t1[(w3 >> 16) & 0xff]  ^ t0[w3 >> 24])
+    for byte in data[n16:]:
+        crc = (crc >> 8) ^ t0[(byte ^ crc) & 0xff]
+    return crc ^ 0xffffffff
+
+## CRC-32 slicing-by-4
+##  - same as slicing-by-8, with one 32-bit word per iteration
+def crc_32_slice_by_4(data, crc=0):
+    data = _byte_view(data)
+    t0,t1,t2,t3 = get_crc_32_slicing_tables(4)
+    crc ^= 0xffffffff
+    n4 = len(data) - (len(data) % 4)
+    for (w0,) in struct.iter_unpack('<I', data[:n4]):
+        w0 ^= crc
+        crc = t3[w0 & 0xff] ^ t2[(w0 >> 8) & 0xff] ^ t1[(w0 >> 16) & 0xff] ^ t0[w0 >> 24]
+    for byte in data[n4:]:
+        crc = (crc >> 8) ^ t0[(byte ^ crc) & 0xff]
+    return crc ^ 0xffffffff
+
+## CRC-32 slicing-by-32
+##  - same as slicing-by-8, with 32 bytes (eight 32-bit words) per iteration
+def crc_32_slice_by_32(data, crc=0):
+    data = _byte_view(data)
+    t = get_crc_32_slicing_tables(32)
+    crc ^= 0xffffffff
+    n32 = len(data) - (len(data) % 32)
+    for w0, w1, w2, w3, w4, w5, w6, w7 in struct.iter_unpack('<8I', data[:n32]):
+        w0 ^= crc
+        crc = (t[31][w0 & 0xff] ^ t[30][(w0 >> 8) & 0xff] ^ t[29][(w0 >> 16) & 0xff] ^ t[28][w0 >> 24] ^
+               t[27][w1 & 0xff] ^ t[26][(w1 >> 8) & 0xff] ^ t[25][(w1 >> 16) & 0xff] ^ t[24][w1 >> 24] ^
+               t[23][w2 & 0xff] ^ t[22][(w2 >> 8) & 0xff] ^ t[21][(w2 >> 16) & 0xff] ^ t[20][w2 >> 24] ^
+               t[19][w3 & 0xff] ^ t[18][(w3 >> 8) & 0xff] ^ t[17][(w3 >> 16) & 0xff] ^ t[16][w3 >> 24] ^
+               t[15][w4 & 0xff] ^ t[14][(w4 >> 8) & 0xff] ^ t[13][(w4 >> 16) & 0xff] ^ t[12][w4 >> 24] ^
+               t[11][w5 & 0xff] ^ t[10][(w5 >> 8) & 0xff] ^ t[9][(w5 >> 16) & 0xff] ^ t[8][w5 >> 24] ^
+               t[7][w6 & 0xff] ^ t[6][(w6 >> 8) & 0xff] ^ t[5][(w6 >> 16) & 0xff] ^ t[4][w6 >> 24] ^
+               t[3][w7 & 0xff] ^ t[2][(w7 >> 8) & 0xff] ^ t[1][(w7 >> 16) & 0xff] ^ t[0][w7 >> 24])
+    t0 = t[0]
+    for byte in data[n32:]:
+        crc = (crc >> 8) ^ t0[(byte ^ crc) & 0xff]
+    return crc ^ 0xffffffff
+
+## CRC-32 of a batch of equal length frames
+##  - frames is an (N, L) uint8 array, one frame per row
+##  - all N running CRCs are stepped one byte column at a time,
+##    with a single table gather per column
+##  - returns N CRC-32 values as a uint32 array
+def crc_32_batch(frames, crc_32_table=None):
+    import numpy as np
+    frames = np.asarray(frames, dtype=np.uint8)
+    if frames.ndim != 2:
+        raise ValueError("frames must be an (N, L) array")
+    if crc_32_table is None:
+        crc_32_table = get_crc_32_slicing_tables(1)[0]
+    table = np.asarray(crc_32_table, dtype=np.uint32)
+
+    ## column access is contiguous in Fortran order
+    frames = np.asfortranarray(frames)
+    crc = np.full(frames.shape[0], 0xffffffff, dtype=np.uint32)
+    index = np.empty(frames.shape[0], dtype=np.uint32)
+    for col in range(frames.shape[1]):
+        np.bitwise_xor(crc, frames[:, col], out=index)
+        np.bitwise_and(index, 0xff, out=index)
+        crc >>= 8
+        crc ^= table[index]
+    return crc ^ np.uint32(0xffffffff)
+
+## CRC is linear over GF(2): crc(a ^ b) = crc(a) ^ crc(b) (see CRC-8 demo below)
+##  - feeding zero bytes through the reciprocal CRC register is a 32x32
+##    GF(2) matrix, stored as 32 column words (column i = image of bit i)
+##  - the operator for 2^k zero bytes is found by squaring, so any number
+##    of zeros costs O(log n) matrix-vector products
+def gf2_matrix_times(mat, vec):
+    res = 0
+    i = 0
+    while vec:
+        if vec & 1: res ^= mat[i]
+        vec >>= 1
+        i += 1
+    return res
+
+def gf2_matrix_square(mat):
+    return [gf2_matrix_times(mat, col) for col in mat]
+
+## zero-byte operators, _crc32_zeros_ops[k] feeds 2^k zero bytes
+_crc32_zeros_ops = []
+
+def _crc32_zeros_op(k):
+    if not _crc32_zeros_ops:
+        ## operator for one zero bit: shift right, XOR poly when LSB set
+        op = [0xedb88320] + [1 << (i-1) for i in range(1, 32)]
+        ## square three times to get operator for one zero byte
+        for i in range(3): op = gf2_matrix_square(op)
+        _crc32_zeros_ops.append(op)
+    while len(_crc32_zeros_ops) <= k:
+        _crc32_zeros_ops.append(gf2_matrix_square(_crc32_zeros_ops[-1]))
+    return _crc32_zeros_ops[k]
+
+## Shift a raw CRC-32 register through 'nbytes' zero bytes
+def crc32_shift(crc, nbytes):
+    k = 0
+    while nbytes:
+        if nbytes & 1: crc = gf2_matrix_times(_crc32_zeros_op(k), crc)
+        nbytes >>= 1
+        k += 1
+    return crc
+
+## CRC-32 of (message + 'nbytes' zero bytes), given CRC-32 of message
+def crc32_zero_extend(crc, nbytes):
+    return crc32_shift(crc ^ 0xffffffff, nbytes) ^ 0xffffffff
+
+## CRC-32 of (a + b), given crc_a = CRC-32(a), crc_b = CRC-32(b), len_b = len(b)
+##  - the init/ final XOR terms cancel, so only crc_a must be shifted
+def crc32_combine(crc_a, crc_b, len_b):
+    return crc32_shift(crc_a, len_b) ^ crc_b
+
+## worker: CRC-32 of one chunk of a memory-mapped file
+def _crc32_file_chunk(path, offset, length, engine):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            return engine(view[offset:offset+length])
+        finally:
+            view.release()
+
+## worker: CRC-32 of one chunk of an in-memory buffer
+def _crc32_buffer_chunk(chunk, engine):
+    return engine(chunk)
+
+## smallest chunk handed to a worker when chunk_size is not given
+PARALLEL_CRC32_MIN_CHUNK = 1 << 20
+
+## CRC-32 of a large file or buffer using a pool of worker processes
+##  1. split the input into 'workers' (or 'chunk_size') sized chunks
+##  2. hash each chunk in its own process
+##     - files are memory-mapped by each worker, only (offset, length) is sent
+##  3. stitch the chunk CRCs back together with crc32_combine
+##  - 'engine' is any CRC-32 function f(data) -> int defined at module level
+def parallel_crc32(path_or_buffer, workers=None, chunk_size=None, engine=z.crc32):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    is_path = isinstance(path_or_buffer, (str, os.PathLike))
+    if is_path:
+        total_len = os.path.getsize(path_or_buffer)
+    else:
+        path_or_buffer = _byte_view(path_or_buffer)
+        total_len = len(path_or_buffer)
+
+    ## small inputs are not worth the cost of starting a pool
+    if chunk_size is None:
+        chunk_size = max(-(-total_len // workers), PARALLEL_CRC32_MIN_CHUNK)
+    chunk_size = max(chunk_size, 1)
+    chunks = [(offset, min(chunk_size, total_len - offset)) for offset in range(0, total_len, chunk_size)]
+
+    ## nothing to split, no need to start a pool
+    if workers <= 1 or len(chunks) <= 1:
+        if is_path:
+            return _crc32_file_chunk(path_or_buffer, 0, total_len, engine) if total_len else engine(b'')
+        return engine(path_or_buffer)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if is_path:
+            futures = [pool.submit(_crc32_file_chunk, path_or_buffer, offset, length, engine)
+                       for offset, length in chunks]
+        else:
+            futures = [pool.submit(_crc32_buffer_chunk, path_or_buffer[offset:offset+length].tobytes(), engine)
+                       for offset, length in chunks]
+        crc = 0
+        for (offset, length), future in zip(chunks, futures):
+            crc = crc32_combine(crc, future.result(), length)
+    return crc
+
+## CRC-32 with 'lanes' bytes per step (4/ 8/ 16/ 32), following the four
+##  step process at the top of this file
+##  1. XOR the running CRC into the next 'lanes' bytes (little endian word)
+##  2./3. each byte lane indexes its own zero-padded table
+##        (lane k is followed by lanes-1-k zero bytes)
+##  4. XOR the per-lane results together
+##  - bytes left over at the end are done one at a time
+CRC_32_LANE_WIDTHS = (4, 8, 16, 32)
+
+## each width runs on its unrolled slicing-by-N engine
+_crc_32_lane_engines = {4: crc_32_slice_by_4, 8: crc_32_slice_by_8,
+                        16: crc_32_slice_by_16, 32: crc_32_slice_by_32}
+
+def crc_32_lanes(data, lanes=8, crc=0):
+    if lanes not in CRC_32_LANE_WIDTHS:
+        raise ValueError("lanes must be one of %s" % (CRC_32_LANE_WIDTHS,))
+    return _crc_32_lane_engines[lanes](data, crc)
+
+## one raw register step of the lane datapath (no init/ final XOR)
+def _crc_32_lane_step(reg, word, tables):
+    word ^= reg
+    reg = 0
+    for table in tables:
+        reg ^= table[word & 0xff]
+        word >>= 8
+    return reg
+
+## XOR matrices of the 'lanes' bytes per clock datapath
+##  next_crc(r) = parity(crc & crc_matrix[r]) ^ parity(data & data_matrix[r])
+##  - crc/ next_crc are the raw (reflected) 32-bit register
+##  - data bit (8*k + j) is bit j of byte k, byte 0 first on the wire
+##  - found column by column from linearity, one bit set at a time
+def crc_32_lane_matrices(lanes=8):
+    tables = get_crc_32_slicing_tables(lanes)[::-1]
+    crc_cols = [_crc_32_lane_step(1 << i, 0, tables) for i in range(32)]
+    data_cols = [_crc_32_lane_step(0, 1 << i, tables) for i in range(8 * lanes)]
+    crc_matrix = [sum(((col >> r) & 1) << i for i, col in enumerate(crc_cols)) for r in range(32)]
+    data_matrix = [sum(((col >> r) & 1) << i for i, col in enumerate(data_cols)) for r in range(32)]
+    return crc_matrix, data_matrix
+
+## lane matrices are only built once per lane count
+_crc_32_lane_matrices = {}
+
+def get_crc_32_lane_matrices(lanes=8):
+    if lanes not in _crc_32_lane_matrices:
+        _crc_32_lane_matrices[lanes] = crc_32_lane_matrices(lanes)
+    return _crc_32_lane_matrices[lanes]
+
+## Golden model of the hardware datapath, built only from the XOR matrices
+##  - bytes left over at the end are done one at a time
+def crc_32_lanes_model(data, lanes=8, crc=0):
+    crc_matrix, data_matrix = get_crc_32_lane_matrices(lanes)
+    data = _byte_view(data)
+    reg = crc ^ 0xffffffff
+    n_words = len(data) - (len(data) % lanes)
+    for idx in range(0, n_words, lanes):
+        word = int.from_bytes(data[idx:idx+lanes], 'little')
+        next_reg = 0
+        for r in range(32):
+            bit = ((reg & crc_matrix[r]).bit_count() ^ (word & data_matrix[r]).bit_count()) & 1
+            next_reg |= bit << r
+        reg = next_reg
+    t0 = get_crc_32_slicing_tables(1)[0]
+    for byte in data[n_words:]:
+        reg = (reg >> 8) ^ t0[(byte ^ reg) & 0xff]
+    return reg ^ 0xffffffff
+
+## Export the lane XOR matrices as a VHDL package of constants
+##  - row r of each matrix is the set of input bits XOR'd into crc bit r
+def crc_32_lanes_vhdl(lanes=8, package_name=None):
+    crc_matrix, data_matrix = get_crc_32_lane_matrices(lanes)
+    data_bits = 8 * lanes
+    if package_name is None:
+        package_name = "crc32_lane%d_pkg" % lanes
+
+    def rows(matrix, bits):
+        return ",\n".join('    %2d => x"%0*X"' % (r, bits // 4, row) for r, row in enumerate(matrix))
+
+    return "\n".join([
+        "-- CRC-32 (reflected, poly 0xEDB88320) XOR matrices, %d bytes per clock" % lanes,
+        "-- next_crc(r) = xor_reduce(crc and CRC32_CRC_XOR(r)) xor xor_reduce(data and CRC32_DATA_XOR(r))",
+        "-- data bit (8*k + j) is bit j of byte k, byte 0 first on the wire",
+        "-- generated by crc_parallelization.crc_32_lanes_vhdl()",
+        "",
+        "library IEEE;",
+        "use ieee.std_logic_1164.all;",
+        "",
+        "package %s is" % package_name,
+        "",
+        "  constant CRC32_LANE_BYTES : integer := %d;" % lanes,
+        "",
+        "  type crc32_crc_matrix  is array (0 to 31) of std_logic_vector(31 downto 0);",
+        "  type crc32_data_matrix is array (0 to 31) of std_logic_vector(%d downto 0);" % (data_bits - 1),
+        "",
+        "  constant CRC32_CRC_XOR : crc32_crc_matrix := (",
+        rows(crc_matrix, 32),
+        "  );",
+        "",
+        "  constant CRC32_DATA_XOR : crc32_data_matrix := (",
+        rows(data_matrix, data_bits),
+        "  );",
+        "",
+        "end package %s;" % package_name,
+        "",
+    ])
+
+## Streaming CRC-32 hasher with a hashlib style interface
+##  - update(chunk) folds each chunk into the running CRC (slicing-by-8
+##    on the reciprocal table), so only one chunk is held in memory
+##  - digest() is the CRC-32 as 4 big-endian bytes
+class CRC32:
+
+    name = 'crc32'
+    digest_size = 4
+    block_size = 8
+
+    def __init__(self, data=b'', crc=0):
+        self.crc = crc
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        self.crc = crc_32_slice_by_8(data, self.crc)
+
+    def copy(self):
+        return CRC32(crc=self.crc)
+
+    def digest(self):
+        return self.crc.to_bytes(4, 'big')
+
+    def hexdigest(self):
+        return '%08x' % self.crc
+
+## Generic CRC parameter model (Rocksoft/ "catalogue" style)
+##  - width:  number of bits in the CRC register
+##  - poly:   generator polynomial, normal (non-reversed) form, top bit omitted
+##  - init:   initial register value
+##  - refin:  input bytes are reflected (processed LSB first)
+##  - refout: final register is reflected before the final XOR
+##  - xorout: value XOR'd into the final register
+##  - check:  CRC of b"123456789", used for conformance checks
+CRCSpec = namedtuple('CRCSpec', ['name', 'width', 'poly', 'init', 'refin', 'refout', 'xorout', 'check'],
+                     defaults=[None])
+
+## Common CRC specs
+CRC_SPECS = {
+    'CRC-8/SMBUS':     CRCSpec('CRC-8/SMBUS',     8,  0x07,       0x00,       False, False, 0x00,       0xf4),
+    'CRC-16/MODBUS':   CRCSpec('CRC-16/MODBUS',   16, 0x8005,     0xffff,     True,  True,  0x0000,     0x4b37),
+    'CRC-32/ISO-HDLC': CRCSpec('CRC-32/ISO-HDLC', 32, 0x04c11db7, 0xffffffff, True,  True,  0xffffffff, 0xcbf43926),
+    'CRC-32C':         CRCSpec('CRC-32C',         32, 0x1edc6f41, 0xffffffff, True,  True,  0xffffffff, 0xe3069283),
+}
+
+## reflect the lowest 'width' bits of 'value'
+def reflect_bits(value, width):
+    res = 0
+    for i in range(width):
+        res = (res << 1) | ((value >> i) & 1)
+    return res
+
+## Generate the 1-byte lookup table for any CRC spec
+##  - reflected specs use the bit-reversed polynomial, register shifts right
+##    (same as gen_crc_32_reciprocal_table)
+##  - non-reflected specs align each byte with the register MSB
+##    (same as generate_crc32_table)
+def gen_crc_table(spec):
+    if spec.width < 8:
+        raise ValueError("table driven CRC needs width >= 8, got %d" % spec.width)
+    mask = (1 << spec.width) - 1
+    crc_table = []
+    if spec.refin:
+        poly = reflect_bits(spec.poly, spec.width)
+        for byte in range(256):
+            for bit in range(8):
+                if(byte & 1): byte = (byte >> 1) ^ poly
+                else: byte >>= 1
+            crc_table.append(byte)
+    else:
+        top = 1 << (spec.width - 1)
+        for byte in range(256):
+            crc = byte << (spec.width - 8)
+            for bit in range(8):
+                if(crc & top): crc = ((crc << 1) ^ spec.poly) & mask
+                else: crc = (crc << 1) & mask
+            crc_table.append(crc)
+    return crc_table
+
+## tables are built lazily, once per spec
+_crc_tables = {}
+
+def get_crc_table(spec):
+    if isinstance(spec, str):
+        spec = CRC_SPECS[spec]
+    if spec not in _crc_tables:
+        _crc_tables[spec] = gen_crc_table(spec)
+    return _crc_tables[spec]
+
+## Compute the CRC of 'data' for any spec (a CRCSpec, or a name in CRC_SPECS)
+def crc_compute(data, spec):
+    if isinstance(spec, str):
+        spec = CRC_SPECS[spec]
+    crc_table = get_crc_table(spec)
+    data = _byte_view(data)
+    mask = (1 << spec.width) - 1
+
+    if spec.refin:
+        crc = reflect_bits(spec.init, spec.width)
+        for byte in data:
+            crc = (crc >> 8) ^ crc_table[(crc ^ byte) & 0xff]
+    else:
+        crc = spec.init
+        shift = spec.width - 8
+        for byte in data:
+            crc = ((crc << 8) & mask) ^ crc_table[((crc >> shift) ^ byte) & 0xff]
+
+    ## register is reflected when refin is set
+    if spec.refin != spec.refout:
+        crc = reflect_bits(crc, spec.width)
+    return crc ^ spec.xorout
+
+## Demo: CRC-8 linearity and CRC-32 engine cross-check
+##  only runs when this file is executed directly
+def main():
+    ## Test CRC-8 function
+    ina = [0b11001001, 0b11001001]
+    print("crc-a: ", bin(crc_8(ina,0)))
+
+    ## Test CRC-8 linearity
+    in1 = [0b11001001,0b00000000]
+    in2 = [0b00000000,0b11100101]
+    in1_xor_in2 = [in1[0], in2[1]]
+    crc_a_xor_b = crc_8(in1_xor_in2)
+    crc_a_xor_crc_b = crc_8(in1) ^ crc_8(in2)
+    print("CRC(a ^ b):")
+    print(bin(crc_a_xor_b))
+    print("CRC-8(a) ^ CRC-8(b): ")
+    print(bin(crc_a_xor_crc_b))
+
+    ## CRC-32 combine, built on the same linearity
+    crc32_a = [0xAA,0xAA,0xAA,0xAA,0xAA,0xAA]
+    crc32_b = [0x55,0x55,0x55,0x55,0x55,0x55,0xDD,0xDD,0xDD,0xDD]
+    print("crc32_combine: ", hex(crc32_combine(z.crc32(bytes(crc32_a)), z.crc32(bytes(crc32_b)), len(crc32_b))))
+
+    ## CRC-32 reciprocol byte
+    crc32_in = [0xAA,0xAA,0xAA,0xAA,0xAA,0xAA,0x55,0x55,0x55,0x55,0x55,0x55,0xDD,0xDD,0xDD,0xDD]
+    print("crc_32_reciprocol:", hex(crc_32_reciprocal(crc32_in)))
+
+    ## CRC-32 reciprocol table version
+    crc_32_table_r = gen_crc_32_reciprocal_table()
+    crc_32_out_r = crc_32_reciprocol_table(crc32_in, crc_32_table_r)
+    print("crc_32_recip_table: ", hex(crc_32_out_r))
+
+    ## CRC-32 forward table version
+    crc32_table = generate_crc32_table()
+    print("crc-forward: ", hex(ethernet_crc32(crc32_in, crc32_table)))
+    print("crc-forward-fast: ", hex(ethernet_crc32_fast(crc32_in, crc32_table)))
+
+    ## CRC-32 direct
+    print("crc-no_table: ",hex(crc_32(crc32_in)))
+
+    ## CRC-32 slicing-by-8/ slicing-by-16
+    print("crc-slice-8: ",hex(crc_32_slice_by_8(bytes(crc32_in))))
+    print("crc-slice-16: ",hex(crc_32_slice_by_16(bytes(crc32_in))))
+
+    ## CRC-32 N-bytes per step lanes + hardware golden model
+    for lanes in CRC_32_LANE_WIDTHS:
+        print("crc-lanes-%d: " % lanes, hex(crc_32_lanes(crc32_in, lanes)), hex(crc_32_lanes_model(crc32_in, lanes)))
+
+    ## CRC-32 batch of frames
+    print("crc-batch: ",[hex(crc) for crc in crc_32_batch([crc32_in, crc32_in])])
+
+    ## CRC-32 streaming hasher, fed one 4-byte chunk at a time
+    hasher = CRC32()
+    for i in range(0, len(crc32_in), 4):
+        hasher.update(bytes(crc32_in[i:i+4]))
+    print("crc-stream: ", hasher.hexdigest())
+
+    ## CRC spec registry
+    for name in CRC_SPECS:
+        print(name + ": ", hex(crc_compute(crc32_in, name)))
+
+if __name__ == "__main__":
+    main()